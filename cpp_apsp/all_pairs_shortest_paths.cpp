@@ -55,16 +55,56 @@ std::vector<std::vector<int>> relabel_component(std::map<int, std::vector<int>>
     return relabeled;
 }
 
+// Relabels a connected component in BFS order from its highest degree node,
+// so nodes visited together during BFS are stored close together in memory
+std::vector<std::vector<int>> bfs_relabel_component(const std::vector<std::vector<int>> &g) {
+    if (g.empty())
+        return g;
+    unsigned long root = 0;
+    for (unsigned long i = 1; i < g.size(); i++) {
+        if (g[i].size() > g[root].size())
+            root = i;
+    }
+
+    // Labels are ints like the adjacency lists they index, order holds positions into g
+    std::vector<int> mapping(g.size(), -1);
+    std::vector<unsigned long> order;
+    order.reserve(g.size());
+    mapping[root] = 0;
+    order.push_back(root);
+    for (unsigned long pos = 0; pos < order.size(); pos++) {
+        for (auto const &v : g[order[pos]]) {
+            if (mapping[v] == -1) {
+                mapping[v] = static_cast<int>(order.size());
+                order.push_back(static_cast<unsigned long>(v));
+            }
+        }
+    }
+
+    std::vector<std::vector<int>> relabeled(g.size());
+    for (unsigned long i = 0; i < order.size(); i++) {
+        relabeled[i].reserve(g[order[i]].size());
+        for (auto const &v : g[order[i]]) {
+            relabeled[i].push_back(mapping[v]);
+        }
+    }
+    return relabeled;
+}
+
 // Assumes node labels in range 0..g.size()-1
 // In other words, edgelist should be generated from igraph (which uses indices instead of labels)
-std::vector<std::vector<std::vector<int>>> get_components(std::map<int, std::vector<int>> &g) {
+// If reorder is set, each component is relabeled in BFS order, see bfs_relabel_component
+std::vector<std::vector<std::vector<int>>> get_components(std::map<int, std::vector<int>> &g, bool reorder) {
     std::vector<int> visited(g.size(), 0);
     std::vector<std::vector<std::vector<int>>> components;
     for (unsigned long i = 0; i < g.size(); i++) {
         if (!visited[i]) {
             std::map<int, std::vector<int>> component;
             dfs_helper(i, visited, component, g);
-            components.push_back(relabel_component(component));
+            if (reorder)
+                components.push_back(bfs_relabel_component(relabel_component(component)));
+            else
+                components.push_back(relabel_component(component));
         }
     }
     return components;
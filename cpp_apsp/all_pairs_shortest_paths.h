@@ -12,8 +12,10 @@ void dfs_helper(unsigned long u,
                 std::map<int, std::vector<int>> &component,
                 std::map<int, std::vector<int>> &g);
 std::vector<std::vector<int>> relabel_component(std::map<int, std::vector<int>> &g);
+std::vector<std::vector<int>> bfs_relabel_component(const std::vector<std::vector<int>> &g);
 std::vector<std::vector<std::vector<int>>> get_components(std::map<int,
-                                                             std::vector<int>> &g);
+                                                             std::vector<int>> &g,
+                                                           bool reorder = false);
 std::vector<unsigned long> bfs_distances(const std::vector<std::vector<int>> &g,
                                unsigned long starting_node,
                                unsigned long num_nodes,
@@ -28,13 +28,13 @@ std::vector<std::string> get_filenames(std::string filename) {
     return filenames;
 }
 
-std::map<int, double> get_distance_distribution(std::string filename, int num_threads) {
+std::map<int, double> get_distance_distribution(std::string filename, int num_threads, bool reorder) {
     std::map<int, std::vector<int>> g = read_gml(filename);
     //std::map<int, std::vector<int>> g = read_edgelist(filename, 1);
     std::cout << "read gml, num nodes: " << g.size() << std::endl;
 
     auto start = std::chrono::steady_clock::now();
-    std::vector<std::vector<std::vector<int>>> components = get_components(g);
+    std::vector<std::vector<std::vector<int>>> components = get_components(g, reorder);
     
     std::cout << "num components: " << components.size() << std::endl;
     
@@ -116,8 +116,8 @@ void append_distance_distribution_to_file(std::map<int, double> distance_distrib
 }
 
 int main(int argc, char* argv[]) {
-    // Command line args
-    if (argc != 4) return -1;
+    // Command line args, an optional fourth "reorder" relabels components in BFS order
+    if (argc != 4 && argc != 5) return -1;
     std::string list_filename = argv[1];
     std::string output_filename = argv[2];
     std::vector<std::string> filenames = get_filenames(list_filename);
@@ -126,10 +126,11 @@ int main(int argc, char* argv[]) {
         std::cout << fn << std::endl;
     
     auto num_threads = std::stoi(argv[3]);
+    bool reorder = argc == 5 && std::string(argv[4]) == "reorder";
     omp_set_num_threads(num_threads);
 
     for (const auto &graph_fn : filenames) {
-        auto distance_distribution = get_distance_distribution(graph_fn, num_threads);
+        auto distance_distribution = get_distance_distribution(graph_fn, num_threads, reorder);
         append_distance_distribution_to_file(distance_distribution, output_filename, graph_fn);
     }
 
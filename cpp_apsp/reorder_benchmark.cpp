@@ -0,0 +1,100 @@
+//
+// Times BFS from a fixed set of sources with and without get_components' BFS relabeling,
+// the C++ counterpart of py_tools/benchmarks/reorder_benchmark.py.
+// Node ids are shuffled first, standing in for the arbitrary order of a GML file.
+//
+// Build from cpp_apsp: g++ -O3 -std=c++11 reorder_benchmark.cpp all_pairs_shortest_paths.cpp -o reorder_benchmark
+// Run: ./reorder_benchmark [num_nodes] [num_sources]
+//
+
+#include <iostream>
+#include <vector>
+#include <map>
+#include <set>
+#include <random>
+#include <chrono>
+#include <algorithm>
+#include <numeric>
+#include <iomanip>
+#include <string>
+#include "all_pairs_shortest_paths.h"
+
+// Barabasi-Albert graph with m edges per new node, labels shuffled
+std::map<int, std::vector<int>> shuffled_barabasi_albert(int num_nodes, int m, std::mt19937 &rng) {
+    std::vector<int> labels(num_nodes);
+    std::iota(labels.begin(), labels.end(), 0);
+    std::shuffle(labels.begin(), labels.end(), rng);
+
+    std::map<int, std::vector<int>> g;
+    // Every edge endpoint, so a uniform draw picks nodes proportionally to degree
+    std::vector<int> endpoints;
+    for (int u = 0; u < m; u++)
+        g[labels[u]];
+    for (int u = m; u < num_nodes; u++) {
+        std::set<int> targets;
+        while ((int)targets.size() < m) {
+            if (endpoints.empty()) {
+                targets.insert((int)targets.size());
+            } else {
+                std::uniform_int_distribution<unsigned long> pick(0, endpoints.size() - 1);
+                targets.insert(endpoints[pick(rng)]);
+            }
+        }
+        for (auto const &v : targets) {
+            g[labels[u]].push_back(labels[v]);
+            g[labels[v]].push_back(labels[u]);
+            endpoints.push_back(u);
+            endpoints.push_back(v);
+        }
+    }
+    return g;
+}
+
+// Best of several runs of BFS from each source, in seconds
+double time_sources(const std::vector<std::vector<int>> &component,
+                    const std::vector<unsigned long> &sources,
+                    int repeats) {
+    auto num_nodes = component.size();
+    std::vector<unsigned long> visited(num_nodes), dist(num_nodes), tracker(num_nodes);
+    double best = -1;
+    for (int r = 0; r < repeats; r++) {
+        auto start = std::chrono::steady_clock::now();
+        for (auto const &s : sources)
+            bfs_distances(component, s, num_nodes, visited, dist, tracker);
+        std::chrono::duration<double> elapsed = std::chrono::steady_clock::now() - start;
+        if (best < 0 || elapsed.count() < best)
+            best = elapsed.count();
+    }
+    return best;
+}
+
+int main(int argc, char* argv[]) {
+    int num_nodes = argc > 1 ? std::stoi(argv[1]) : 300000;
+    int num_sources = argc > 2 ? std::stoi(argv[2]) : 100;
+    std::mt19937 rng(0);
+    std::map<int, std::vector<int>> g = shuffled_barabasi_albert(num_nodes, 3, rng);
+
+    std::vector<unsigned long> sources(num_nodes);
+    std::iota(sources.begin(), sources.end(), 0);
+    std::shuffle(sources.begin(), sources.end(), rng);
+    sources.resize(num_sources);
+    std::cout << "n = " << num_nodes << ", sources = " << num_sources << std::endl;
+
+    std::cout << std::fixed << std::setprecision(3);
+    double baseline = 0;
+    for (bool reorder : {false, true}) {
+        auto start = std::chrono::steady_clock::now();
+        auto components = get_components(g, reorder);
+        std::chrono::duration<double> elapsed = std::chrono::steady_clock::now() - start;
+        // Connected, so the only component holds every node
+        double seconds = time_sources(components[0], sources, 3);
+        if (!reorder) {
+            baseline = seconds;
+            std::cout << std::setw(8) << "shuffled" << ": " << seconds << "s" << std::endl;
+        } else {
+            std::cout << std::setw(8) << "bfs" << ": " << seconds << "s, " << std::setprecision(2)
+                      << baseline / seconds << "x (get_components took " << elapsed.count() << "s)" << std::endl;
+        }
+    }
+    return 0;
+}
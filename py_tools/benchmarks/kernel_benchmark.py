@@ -0,0 +1,76 @@
+"""
+Times the allocation-free, level-counting BFS kernels against the distance-returning kernels
+they replaced in the APSP drivers, on zkc and synthetic graphs.
+
+Run from py_tools: python -m benchmarks.kernel_benchmark
+"""
+import time
+import numpy as np
+import numba as nb
+import networkx as nx
+from src.graph import semisparse as ss
+from src.graph.empirical import networkx_to_edges
+
+
+@nb.jit(nopython=True, nogil=True, parallel=True)
+def _distance_vector_driver(indptr, indices, num_nodes, trackers, num_bins):
+    """
+    The previous driver. One freshly allocated float64 distance vector per source, binned node by node
+
+    :return: 1d int64 histogram
+    """
+    num_workers = trackers.shape[0]
+    histograms = np.zeros((num_workers, num_bins), dtype=np.int64)
+    for w in nb.prange(num_workers):
+        for k in range(w, num_nodes, num_workers):
+            dist = ss._bfs_distances(indptr, indices, k, num_nodes, trackers[w])
+            for j in range(num_nodes):
+                histograms[w, int(dist[j])] += 1
+    results = np.zeros(num_bins, dtype=np.int64)
+    for w in range(num_workers):
+        results += histograms[w]
+    return results
+
+
+def best_of(f, repeats=5):
+    """
+    :param f: Function without arguments
+    :return: Tuple, (best seconds, result of f)
+    """
+    result = f()
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = f()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    graphs = [('zkc', nx.karate_club_graph()),
+              ('ba(5000, 3)', nx.barabasi_albert_graph(5000, 3, seed=0)),
+              ('ws(5000, 6, 0.05)', nx.connected_watts_strogatz_graph(5000, 6, 0.05, seed=0)),
+              ('grid(70, 70)', nx.convert_node_labels_to_integers(nx.grid_2d_graph(70, 70)))]
+    for name, G in graphs:
+        num_nodes, edges = networkx_to_edges(G)
+        indptr, indices = ss.csr_from_edges(num_nodes, edges)
+        trackers = np.full((1, num_nodes), -1, dtype=indices.dtype)
+        stamps = np.zeros((1, num_nodes), dtype=np.int32)
+        dists = np.zeros((1, num_nodes), dtype=ss._distance_dtype(num_nodes))
+        node_list = np.arange(num_nodes, dtype=np.int64)
+        weights = np.ones(num_nodes, dtype=np.int64)
+
+        old, expected = best_of(lambda: _distance_vector_driver(indptr, indices, num_nodes, trackers, num_nodes))
+        new, result = best_of(lambda: ss._all_pairs_shortest_paths_driver(indptr, indices, num_nodes, node_list,
+                                                                          weights, trackers, stamps, dists,
+                                                                          num_nodes, False))
+        hybrid, hybrid_result = best_of(lambda: ss._all_pairs_shortest_paths_driver(indptr, indices, num_nodes,
+                                                                                    node_list, weights, trackers,
+                                                                                    stamps, dists, num_nodes, True))
+        assert np.array_equal(expected, result) and np.array_equal(expected, hybrid_result)
+        print('{:>18}: distance vectors {:.2f}ms, level counts {:.2f}ms ({:.2f}x), hybrid level counts {:.2f}ms'
+              .format(name, 1000 * old, 1000 * new, old / new, 1000 * hybrid))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Landmark oracle hit rate and query throughput against plain bidirectional BFS,
+for a few landmark counts and both landmark selections.
+
+Run from py_tools: python -m benchmarks.landmark_benchmark
+"""
+import time
+import igraph
+import numpy as np
+from src.graph.bidirectional_bfs import csr_from_igraph, distances
+from src.graph.landmarks import LandmarkOracle
+
+
+def main():
+    num_queries = 20000
+    graphs = [('zkc', igraph.Graph.Famous(name='Zachary')),
+              ('ba(20000, 3)', igraph.Graph.Barabasi(20000, 3)),
+              ('ws(20000, 3, 0.05)', igraph.Graph.Watts_Strogatz(1, 20000, 3, 0.05)),
+              ('grid(150, 150)', igraph.Graph.Lattice([150, 150], circular=False))]
+    np.random.seed(0)
+    for name, g in graphs:
+        pairs = np.random.randint(0, g.vcount(), size=(num_queries, 2))
+        csr = csr_from_igraph(g)
+        distances(csr, pairs[:10])
+        start = time.perf_counter()
+        expected = distances(csr, pairs)
+        bfs = time.perf_counter() - start
+        print('{:>18}: bidirectional BFS {:.0f} queries/s'.format(name, num_queries / bfs))
+        for selection in ['degree', 'random']:
+            for num_landmarks in [4, 16, 64]:
+                start = time.perf_counter()
+                oracle = LandmarkOracle(g, num_landmarks=num_landmarks, selection=selection, seed=0)
+                build = time.perf_counter() - start
+                oracle.distances(pairs[:10])
+                oracle.num_queries = oracle.num_hits = 0
+                start = time.perf_counter()
+                result = oracle.distances(pairs)
+                query = time.perf_counter() - start
+                assert np.array_equal(expected, result)
+                print('{:>18}  {:>6} x{:<3} build {:.1f}ms, hit rate {:.1%}, {:.0f} queries/s ({:.2f}x)'
+                      .format('', selection, num_landmarks, 1000 * build, oracle.hit_rate, num_queries / query,
+                              bfs / query))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Times BFS from a fixed set of sources under each node ordering.
+Node ids are shuffled first, standing in for the arbitrary order of a GML file.
+
+Run from py_tools: python -m benchmarks.reorder_benchmark [num_nodes] [num_sources]
+The C++ tool's reordering is timed the same way by cpp_apsp/reorder_benchmark.cpp.
+"""
+import sys
+import time
+import numpy as np
+import networkx as nx
+from src.graph import semisparse as ss
+from src.graph.empirical import networkx_to_edges
+from src.graph.reorder import node_order
+
+
+def time_sources(num_nodes, edges, sources, repeats=3):
+    """
+    Best of several runs of the APSP driver over the given sources
+
+    :param num_nodes: Number of nodes, graph must be connected
+    :param edges: m x 2 ndarray of node ids
+    :param sources: ndarray of source nodes
+    :param repeats: Number of timed runs
+    :return: Seconds
+    """
+    indptr, indices = ss.csr_from_edges(num_nodes, edges)
+    trackers = np.full((1, num_nodes), -1, dtype=indices.dtype)
+    stamps = np.zeros((1, num_nodes), dtype=np.int32)
+    dists = np.zeros((1, num_nodes), dtype=np.uint32)
+    weights = np.ones(len(sources), dtype=np.int64)
+    # Compile outside of the timed runs
+    ss._all_pairs_shortest_paths_driver(indptr, indices, num_nodes, sources[:1], weights[:1], trackers, stamps,
+                                        dists, num_nodes, False)
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        ss._all_pairs_shortest_paths_driver(indptr, indices, num_nodes, sources, weights, trackers, stamps, dists,
+                                            num_nodes, False)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(num_nodes=300000, num_sources=100):
+    rng = np.random.RandomState(0)
+    num_nodes, edges = networkx_to_edges(nx.barabasi_albert_graph(num_nodes, 3, seed=0))
+    shuffle = rng.permutation(num_nodes)
+    edges = shuffle[edges]
+    sources = rng.choice(num_nodes, num_sources, replace=False)
+    print('n = {}, m = {}, sources = {}'.format(num_nodes, len(edges), num_sources))
+
+    baseline = time_sources(num_nodes, edges, sources)
+    print('{:>8}: {:.3f}s'.format('shuffled', baseline))
+    for method in ('bfs', 'rcm', 'degree'):
+        start = time.perf_counter()
+        order = node_order(num_nodes, edges, method)
+        elapsed = time.perf_counter() - start
+        new_ids = np.empty(num_nodes, dtype=np.int64)
+        new_ids[order] = np.arange(num_nodes)
+        seconds = time_sources(num_nodes, new_ids[edges], new_ids[sources])
+        print('{:>8}: {:.3f}s, {:.2f}x (ordering took {:.2f}s)'.format(method, seconds, baseline / seconds, elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -1,5 +1,10 @@
 import networkx
 import igraph
+import numpy as np
+import numba as nb
+jit = nb.jit
+from .empirical import igraph_to_edges
+from .semisparse import csr_from_edges, _num_workers, _numba_threads
 
 
 def bidirectional_bfs_distance_networkx(G, s, t):
@@ -88,3 +93,150 @@ def bidirectional_bfs_distance_igraph(G, s, t):
                         reverse_fringe.append(w)
                     if w in dist_pred:  # found path
                         return dist_pred[w] + dist_succ[w]
+
+
+def csr_from_igraph(g):
+    """
+    Precomputes CSR adjacency of an igraph graph, for repeated calls to distances
+
+    :param g: igraph.Graph
+    :return: Tuple, (indptr ndarray, indices ndarray)
+    """
+    return csr_from_edges(*igraph_to_edges(g))
+
+
+def distances(graph, pairs, num_threads=1):
+    """
+    Bulk bidirectional BFS distances, computed in jitted code without the GIL
+
+    :param graph: igraph.Graph, or (indptr, indices) tuple from csr_from_igraph to skip rebuilding the adjacency
+    :param pairs: k x 2 ndarray of (source, target) node ids
+    :param num_threads: Number of threads to split pairs across. If None, uses every thread available to numba
+    :return: 1d int64 ndarray of k distances, -1 where the target can't be reached
+    """
+    if isinstance(graph, igraph.Graph):
+        graph = csr_from_igraph(graph)
+    indptr, indices = graph
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    num_nodes = len(indptr) - 1
+    num_workers = _num_workers(num_threads, len(pairs))
+    # Forward and reverse buffers for each worker
+    stamps = np.zeros((num_workers, 2, num_nodes), dtype=np.int32)
+    dists = np.zeros((num_workers, 2, num_nodes), dtype=np.int32)
+    queues = np.zeros((num_workers, 2, num_nodes), dtype=indices.dtype)
+    with _numba_threads(num_workers):
+        return _distances_driver(indptr, indices, pairs, stamps, dists, queues)
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _distances_driver(indptr, indices, pairs, stamps, dists, queues):
+    """
+    Jitted driver for bulk bidirectional BFS. Pairs are dealt round-robin to one worker per row of stamps.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param pairs: k x 2 ndarray of (source, target) node ids
+    :param stamps: num_workers x 2 x n int32 visit stamps, zeroed
+    :param dists: num_workers x 2 x n int32 distance buffers
+    :param queues: num_workers x 2 x n queue buffers
+    :return: 1d int64 ndarray of distances, -1 where the target can't be reached
+    """
+    num_workers = stamps.shape[0]
+    results = np.empty(len(pairs), dtype=np.int64)
+    for w in nb.prange(num_workers):
+        epoch = 0
+        for k in range(w, len(pairs), num_workers):
+            epoch += 1
+            results[k] = _bidirectional_bfs_distance(indptr, indices, pairs[k, 0], pairs[k, 1], stamps[w], epoch,
+                                                     dists[w], queues[w], len(indptr))
+    return results
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _pair_distances(indptr, indices, pairs, stamp, dist, queue):
+    """
+    Jitted single-threaded bidirectional BFS over a batch of pairs,
+    for callers that run batches concurrently on their own threads
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param pairs: k x 2 ndarray of (source, target) node ids
+    :param stamp: 2 x n int32 visit stamps. Cleared on entry
+    :param dist: 2 x n int32 distance buffer
+    :param queue: 2 x n queue buffer
+    :return: 1d int64 ndarray of distances, -1 where the target can't be reached
+    """
+    stamp[:] = 0
+    results = np.empty(len(pairs), dtype=np.int64)
+    for k in range(len(pairs)):
+        results[k] = _bidirectional_bfs_distance(indptr, indices, pairs[k, 0], pairs[k, 1], stamp, k + 1, dist, queue,
+                                                 len(indptr))
+    return results
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _bidirectional_bfs_distance(indptr, indices, s, t, stamp, epoch, dist, queue, limit):
+    """
+    Jitted bidirectional BFS, same search order as bidirectional_bfs_distance_igraph.
+    Row 0 of each buffer belongs to the search from s, row 1 to the search from t.
+    A node is visited by a search iff its stamp equals epoch, so buffers never need clearing between pairs.
+    Until the searches meet, the distance exceeds the sum of their depths,
+    so the search stops as soon as that sum reaches a known upper bound.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param s: Source node
+    :param t: Target node
+    :param stamp: 2 x n visit stamps, no entry may equal epoch on entry
+    :param epoch: Stamp of this search
+    :param dist: 2 x n distance buffer
+    :param queue: 2 x n queue buffer, each level of a search is contiguous
+    :param limit: Upper bound on the distance if t is reachable, n for no bound
+    :return: Distance between nodes, -1 if t can't be reached
+    """
+    if s == t:
+        return 0
+    stamp[0, s] = epoch
+    stamp[1, t] = epoch
+    dist[0, s] = 0
+    dist[1, t] = 0
+    queue[0, 0] = s
+    queue[1, 0] = t
+    # Fringes are queue[0, forward_start:forward_end] and queue[1, reverse_start:reverse_end]
+    forward_start = 0
+    forward_end = 1
+    reverse_start = 0
+    reverse_end = 1
+
+    while forward_end > forward_start and reverse_end > reverse_start:
+        if dist[0, queue[0, forward_start]] + dist[1, queue[1, reverse_start]] + 1 >= limit:
+            return limit
+        # Expand the smaller fringe
+        if forward_end - forward_start <= reverse_end - reverse_start:
+            side = 0
+            fringe_start = forward_start
+            fringe_end = forward_end
+        else:
+            side = 1
+            fringe_start = reverse_start
+            fringe_end = reverse_end
+        other = 1 - side
+        end = fringe_end
+        for pos in range(fringe_start, fringe_end):
+            v = queue[side, pos]
+            for i in range(indptr[v], indptr[v + 1]):
+                w = indices[i]
+                if stamp[side, w] != epoch:
+                    stamp[side, w] = epoch
+                    dist[side, w] = dist[side, v] + 1
+                    queue[side, end] = w
+                    end += 1
+                if stamp[other, w] == epoch:  # path found
+                    return dist[side, w] + dist[other, w]
+        if side == 0:
+            forward_start = fringe_end
+            forward_end = end
+        else:
+            reverse_start = fringe_end
+            reverse_end = end
+    return -1
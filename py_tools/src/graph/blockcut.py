@@ -0,0 +1,375 @@
+import networkx as nx
+import numpy as np
+import numba as nb
+jit = nb.jit
+from collections import defaultdict
+from .empirical import networkx_to_edges
+from .semisparse import csr_from_edges, _bfs_distances, _add_histogram
+
+
+def all_pairs_shortest_paths_blockcut(G):
+    """
+    Exact distance distribution using the block-cut tree of each component.
+    BFS only runs inside biconnected blocks, pairs in different blocks are combined through articulation points.
+
+    :param G: nx.Graph
+    :return: distribution dictionary with keys as distances and values as the number of distances,
+             same as semisparse.all_pairs_shortest_paths
+    """
+    results = defaultdict(int)
+    if len(G) <= 1:
+        results[0.0] += 1
+        return results
+    for c in nx.connected_components(G):
+        if len(c) <= 1:
+            results[0.0] += 1
+        else:
+            _add_histogram(results, _component_histogram(_BlockCutTree(G.subgraph(c))))
+    return results
+
+
+def all_pairs_shortest_paths_blockcut_rolling_sum(G):
+    """
+    Exact sum of distances using the block-cut tree of each component.
+    Each block contributes sum_{u,v} d(u,v) |W_u| |W_v|, where W_u is the set of nodes reaching the block through u.
+
+    :param G: nx.Graph
+    :return: Tuple, (num distances, sum distances), same as semisparse.all_pairs_shortest_paths_rolling_sum
+    """
+    if len(G) <= 1:
+        return 1, 0
+    num_distances = 0
+    sum_distances = 0
+    for c in nx.connected_components(G):
+        num_distances += len(c) ** 2
+        if len(c) > 1:
+            sum_distances += _component_sum(_BlockCutTree(G.subgraph(c)))
+    return num_distances, sum_distances
+
+
+class _BlockCutTree:
+    def __init__(self, G):
+        """
+        Block-cut tree of a connected graph, rooted at its first block.
+        Blocks are relabeled to local CSR adjacency so they can be handed to the BFS kernels.
+
+        :param G: Connected nx.Graph with at least two nodes
+        """
+        self.num_nodes = len(G)
+        indptr, indices = csr_from_edges(*networkx_to_edges(G))
+        block_labels, block_edges = _biconnected_component_edges(indptr, indices, self.num_nodes)
+        order = np.argsort(block_labels, kind='stable')
+        splits = np.flatnonzero(np.diff(block_labels[order])) + 1
+
+        self.blocks = []
+        self.position = []
+        self.adjacency = []
+        blocks_of_node = defaultdict(list)
+        for edges in np.split(block_edges[order], splits):
+            nodes, local_edges = np.unique(edges, return_inverse=True)
+            nodes = nodes.tolist()
+            self.blocks.append(nodes)
+            # Position of each node within the block, matching the CSR ids
+            self.position.append({v: i for i, v in enumerate(nodes)})
+            if len(nodes) == 2:
+                # Bridges are combined in closed form and never reach the BFS kernels
+                self.adjacency.append(None)
+            else:
+                self.adjacency.append(csr_from_edges(len(nodes), local_edges.reshape(-1, 2)))
+            for v in nodes:
+                blocks_of_node[v].append(len(self.blocks) - 1)
+
+        # Articulation points are exactly the nodes shared by several blocks
+        blocks_of_cut = {v: b for v, b in blocks_of_node.items() if len(b) > 1}
+        self.cuts = set(blocks_of_cut)
+
+        # Root at block 0. Every cut vertex has a parent block, every other block has a parent cut
+        self.parent_cut = [None] * len(self.blocks)
+        self.child_cuts = [[] for _ in self.blocks]
+        self.child_blocks = defaultdict(list)
+        self.order = [0]
+        seen_cuts = set()
+        for i in self.order:
+            for v in self.blocks[i]:
+                if v in self.cuts and v != self.parent_cut[i] and v not in seen_cuts:
+                    seen_cuts.add(v)
+                    self.child_cuts[i].append(v)
+                    for j in blocks_of_cut[v]:
+                        if j != i:
+                            self.parent_cut[j] = v
+                            self.child_blocks[v].append(j)
+                            self.order.append(j)
+
+
+def _component_sum(tree):
+    """
+    Sum of distances over ordered pairs of a connected component
+
+    :param tree: _BlockCutTree
+    :return: int
+    """
+    # Nodes below each block (excluding its parent cut) and below each cut vertex (including itself)
+    block_size = [0] * len(tree.blocks)
+    cut_size = {}
+    for i in reversed(tree.order):
+        for c in tree.child_cuts[i]:
+            cut_size[c] = 1 + sum(block_size[j] for j in tree.child_blocks[c])
+        block_size[i] = sum(cut_size.get(v, 1) if v in tree.cuts else 1
+                            for v in tree.blocks[i] if v != tree.parent_cut[i])
+
+    sum_distances = 0
+    for i in tree.order:
+        weights = np.ones(len(tree.blocks[i]), dtype=np.int64)
+        for c in tree.child_cuts[i]:
+            weights[tree.position[i][c]] = cut_size[c]
+        if tree.parent_cut[i] is not None:
+            weights[tree.position[i][tree.parent_cut[i]]] = tree.num_nodes - block_size[i]
+        if tree.adjacency[i] is None:
+            # Both orderings of a bridge, at distance 1
+            sum_distances += 2 * int(weights[0]) * int(weights[1])
+        else:
+            indptr, indices = tree.adjacency[i]
+            sum_distances += int(_block_weighted_sum_driver(indptr, indices, len(weights), weights))
+    return sum_distances
+
+
+def _component_histogram(tree):
+    """
+    Histogram of distances over ordered pairs of a connected component.
+    Each ordered pair (x, y) is counted once, in the first block on the path from x to y:
+    hist = n at distance 0 + sum_B sum_{u in B} S(B, u), S(B, u) = sum_{v in B, v != u} P_v shifted by d_B(u, v),
+    where P_v is the distance profile from v of the nodes reaching B through v.
+
+    :param tree: _BlockCutTree
+    :return: 1d int64 ndarray indexed by distance
+    """
+    # Bottom-up: profiles of child cuts, and S(B, parent cut of B)
+    down_profile = {}
+    down_sum = [None] * len(tree.blocks)
+    for i in reversed(tree.order):
+        for c in tree.child_cuts[i]:
+            profile = np.ones(1, dtype=np.int64)
+            for j in tree.child_blocks[c]:
+                profile = _add_profiles(profile, down_sum[j])
+            down_profile[c] = profile
+        p = tree.parent_cut[i]
+        if p is not None:
+            profiles = _block_profiles(tree, i, down_profile, None)
+            down_sum[i] = _block_profile_sums(tree, i, profiles, [p], [p])[1][0]
+
+    # Top-down: profile of each block's parent cut, then S(B, u) for every node of the block
+    histogram = np.array([tree.num_nodes], dtype=np.int64)
+    up_sum = {}
+    for i in tree.order:
+        p = tree.parent_cut[i]
+        up_profile = None
+        if p is not None:
+            # Parent blocks come first in tree.order, so S(parent block of p, p) is known
+            up_profile = _add_profiles(np.ones(1, dtype=np.int64), up_sum[p])
+            for j in tree.child_blocks[p]:
+                if j != i:
+                    up_profile = _add_profiles(up_profile, down_sum[j])
+        profiles = _block_profiles(tree, i, down_profile, up_profile)
+        total, kept = _block_profile_sums(tree, i, profiles, tree.blocks[i], tree.child_cuts[i])
+        histogram = _add_profiles(histogram, total)
+        for c, s in zip(tree.child_cuts[i], kept):
+            up_sum[c] = s
+    return histogram
+
+
+def _block_profiles(tree, i, down_profile, up_profile):
+    """
+    Packs the distance profile of each node of a block, [1] unless the node is a cut vertex
+
+    :param tree: _BlockCutTree
+    :param i: Block index
+    :param down_profile: Dictionary of profiles for cut vertices below their parent block
+    :param up_profile: Profile of the block's parent cut, None if unknown
+    :return: List of 1d int64 ndarrays in block order
+    """
+    profiles = []
+    for v in tree.blocks[i]:
+        if v == tree.parent_cut[i] and up_profile is not None:
+            profiles.append(up_profile)
+        elif v in down_profile and v != tree.parent_cut[i]:
+            profiles.append(down_profile[v])
+        else:
+            profiles.append(np.ones(1, dtype=np.int64))
+    return profiles
+
+
+def _block_profile_sums(tree, i, profiles, sources, keep):
+    """
+    Computes S(B, u) for nodes u of a block
+
+    :param tree: _BlockCutTree
+    :param i: Block index
+    :param profiles: Profile of every node of the block, in block order
+    :param sources: Nodes u to compute S(B, u) for
+    :param keep: Nodes among sources whose S(B, u) is returned separately
+    :return: sum over sources of S(B, u), list of S(B, u) for u in keep
+    """
+    if tree.adjacency[i] is None:
+        # In a bridge, S(B, u) is the other end's profile one step further away
+        rows = {u: np.concatenate(([0], profiles[1 - tree.position[i][u]])) for u in sources}
+        total = np.zeros(1, dtype=np.int64)
+        for row in rows.values():
+            total = _add_profiles(total, row)
+        return total, [rows[v] for v in keep]
+
+    indptr, indices = tree.adjacency[i]
+    num_nodes = len(profiles)
+    profile_ptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    profile_ptr[1:] = np.cumsum([len(p) for p in profiles])
+    profile_data = np.concatenate(profiles)
+    sources = np.array([tree.position[i][v] for v in sources], dtype=np.int64)
+    keep_index = np.full(num_nodes, -1, dtype=np.int64)
+    for k, v in enumerate(keep):
+        keep_index[tree.position[i][v]] = k
+
+    tracker = np.full(num_nodes, -1, dtype=indices.dtype)
+    eccentricity = int(np.max(_bfs_distances(indptr, indices, 0, num_nodes, tracker)))
+    num_bins = 2 * eccentricity + max(len(p) for p in profiles)
+    total, kept = _block_profile_driver(indptr, indices, num_nodes, sources, keep_index, len(keep),
+                                        profile_ptr, profile_data, num_bins, tracker)
+    return total, list(kept)
+
+
+def _add_profiles(a, b):
+    """
+    Adds two histograms of possibly different lengths
+
+    :param a: 1d ndarray
+    :param b: 1d ndarray
+    :return: 1d ndarray
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    a = a.copy()
+    a[:len(b)] += b
+    return a
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _biconnected_component_edges(indptr, indices, num_nodes):
+    """
+    Jitted iterative Hopcroft-Tarjan DFS, labeling every edge of a connected graph with its biconnected block
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param num_nodes: Number of nodes
+    :return: 1d ndarray of block labels, m x 2 ndarray of edges in the same order
+    """
+    num_edges = (indptr[num_nodes] - indptr[0]) // 2
+    discovery = np.full(num_nodes, -1, dtype=np.int64)
+    low = np.zeros(num_nodes, dtype=np.int64)
+    parent = np.full(num_nodes, -1, dtype=np.int64)
+    next_neighbor = indptr[:num_nodes].astype(np.int64)
+    node_stack = np.zeros(num_nodes, dtype=np.int64)
+    edge_stack = np.zeros((num_edges, 2), dtype=np.int64)
+    block_edges = np.zeros((num_edges, 2), dtype=np.int64)
+    block_labels = np.zeros(num_edges, dtype=np.int64)
+
+    node_top = 0
+    edge_top = 0
+    num_labeled = 0
+    num_blocks = 0
+    node_stack[0] = 0
+    discovery[0] = 0
+    time = 1
+    while node_top >= 0:
+        v = node_stack[node_top]
+        if next_neighbor[v] < indptr[v + 1]:
+            w = indices[next_neighbor[v]]
+            next_neighbor[v] += 1
+            if discovery[w] == -1:
+                parent[w] = v
+                discovery[w] = time
+                low[w] = time
+                time += 1
+                edge_stack[edge_top, 0] = v
+                edge_stack[edge_top, 1] = w
+                edge_top += 1
+                node_top += 1
+                node_stack[node_top] = w
+            elif w != parent[v] and discovery[w] < discovery[v]:
+                # Back edge to an ancestor, pushed once from its lower end
+                edge_stack[edge_top, 0] = v
+                edge_stack[edge_top, 1] = w
+                edge_top += 1
+                low[v] = min(low[v], discovery[w])
+        else:
+            node_top -= 1
+            p = parent[v]
+            if p != -1:
+                low[p] = min(low[p], low[v])
+                if low[v] >= discovery[p]:
+                    # p separates v's subtree, which closes a block ending with the tree edge (p, v)
+                    while True:
+                        edge_top -= 1
+                        block_edges[num_labeled, 0] = edge_stack[edge_top, 0]
+                        block_edges[num_labeled, 1] = edge_stack[edge_top, 1]
+                        block_labels[num_labeled] = num_blocks
+                        num_labeled += 1
+                        if edge_stack[edge_top, 0] == p and edge_stack[edge_top, 1] == v:
+                            break
+                    num_blocks += 1
+    return block_labels, block_edges
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _block_weighted_sum_driver(indptr, indices, num_nodes, weights):
+    """
+    Jitted sum over ordered pairs of a block of d(u, v) * weights[u] * weights[v]
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param num_nodes: Number of nodes in block
+    :param weights: Number of nodes reaching the block through each node
+    :return: int
+    """
+    tracker = np.full(num_nodes, -1, dtype=indices.dtype)
+    total = 0
+    for u in range(num_nodes):
+        dist = _bfs_distances(indptr, indices, u, num_nodes, tracker)
+        row = 0
+        for v in range(num_nodes):
+            row += np.int64(dist[v]) * weights[v]
+        total += weights[u] * row
+    return total
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _block_profile_driver(indptr, indices, num_nodes, sources, keep_index, num_keep,
+                          profile_ptr, profile_data, num_bins, tracker):
+    """
+    Jitted S(B, u) = sum_{v != u} profile_v shifted by d(u, v), for each source u of a block
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param num_nodes: Number of nodes in block
+    :param sources: Nodes u to compute S(B, u) for
+    :param keep_index: Row of the kept output for each node, -1 if not kept
+    :param num_keep: Number of kept rows
+    :param profile_ptr: Offsets of each node's profile into profile_data
+    :param profile_data: Concatenated profiles
+    :param num_bins: Output length, must exceed block diameter plus the longest profile
+    :param tracker: Tracker ndarray
+    :return: 1d int64 ndarray sum over sources, num_keep x num_bins int64 ndarray of kept rows
+    """
+    total = np.zeros(num_bins, dtype=np.int64)
+    kept = np.zeros((num_keep, num_bins), dtype=np.int64)
+    row = np.zeros(num_bins, dtype=np.int64)
+    for u in sources:
+        row[:] = 0
+        dist = _bfs_distances(indptr, indices, u, num_nodes, tracker)
+        for v in range(num_nodes):
+            if v == u:
+                continue
+            d = int(dist[v])
+            for k in range(profile_ptr[v], profile_ptr[v + 1]):
+                row[d + k - profile_ptr[v]] += profile_data[k]
+        total += row
+        if keep_index[u] >= 0:
+            kept[keep_index[u]] = row
+    return total, kept
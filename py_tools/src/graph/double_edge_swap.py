@@ -0,0 +1,250 @@
+import numpy as np
+import numba as nb
+jit = nb.jit
+from ..utils.block_rng import BlockRNG, as_rng
+
+
+# Largest number of swaps drawn at once, bounds the memory taken by the pre-drawn random numbers
+SWAP_BLOCK = 1 << 20
+
+
+class DoubleEdgeSwapEngine:
+    def __init__(self, num_nodes, edges):
+        """
+        Stub-labeled double edge swaps on an edge array, with the same semantics as AbstractMCMCSampler._swap.
+        Edge membership lives in a jitted open-addressing hash set, so a whole batch of swaps runs
+        in one nogil call without touching Python objects.
+        Swaps keep the degree sequence, so degree assortativity only moves with the sum of d_u * d_v over edges,
+        which each accepted swap updates in O(1).
+
+        :param num_nodes: Number of nodes
+        :param edges: m x 2 ndarray of node ids in 0..n-1, at least 2 edges. Edge i keeps position i across swaps
+        """
+        self.num_nodes = num_nodes
+        self.edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+        if len(self.edges) < 2:
+            raise ValueError('Double edge swaps need at least 2 edges')
+        # At most half full, so probe sequences stay short
+        bits = max(4, int(np.ceil(np.log2(4 * len(self.edges)))))
+        self.table = np.full(1 << bits, -1, dtype=np.int64)
+        self.shift = 64 - bits
+        _set_build(self.table, self.shift, self.edges, num_nodes)
+        self.degrees = np.bincount(self.edges.ravel(), minlength=num_nodes).astype(np.int64)
+        self.degree_product_sum = int(np.sum(self.degrees[self.edges[:, 0]] * self.degrees[self.edges[:, 1]]))
+        self._square_sum, self._cube_sum = _degree_power_sums(self.degrees)
+        self.num_swaps = 0
+        self.num_accepted = 0
+
+    def run(self, num_swaps, rng=None):
+        """
+        Attempts num_swaps swaps.
+        A BlockRNG is read in per-swap order, (first edge, second edge, orientation), with the same uniform to
+        integer mapping as its scalar draws, so a seed gives the same chain as AbstractMCMCSampler._swap.
+        Other sources draw all first edges of a block, then all second edges, then all orientations,
+        so the same seed gives a different, equally distributed, chain than the networkx backend.
+
+        :param num_swaps: Number of swaps
+        :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+        :return: Number of accepted swaps
+        """
+        m = len(self.edges)
+        accepted = 0
+        for start in range(0, num_swaps, SWAP_BLOCK):
+            size = min(SWAP_BLOCK, num_swaps - start)
+            if isinstance(rng, BlockRNG):
+                draws = rng.uniforms(3 * size).reshape(size, 3)
+                first = (draws[:, 0] * m).astype(np.int64)
+                second = (draws[:, 1] * (m - 1)).astype(np.int64)
+                accepted += self.run_draws(first, second, draws[:, 2])
+            else:
+                other = as_rng(rng)
+                accepted += self.run_draws(other.integers(m, size=size), other.integers(m - 1, size=size),
+                                           other.random(size))
+        return accepted
+
+    def run_draws(self, first, second, flips):
+        """
+        Attempts one swap per draw. Swap k uses first[k], second[k] and flips[k] the way AbstractMCMCSampler._swap
+        uses its three draws, so feeding the draws _swap would make gives the same chain
+
+        :param first: ndarray of draws in 0..m-1, position of the first edge
+        :param second: ndarray of draws in 0..m-2, position of the second edge
+        :param flips: ndarray of uniforms, orientation of the second edge
+        :return: Number of accepted swaps
+        """
+        accepted, delta = _swap_driver(self.edges, self.table, self.shift, self.num_nodes, self.degrees,
+                                       np.asarray(first, dtype=np.int64), np.asarray(second, dtype=np.int64),
+                                       np.asarray(flips, dtype=np.float64))
+        self.degree_product_sum += int(delta)
+        self.num_swaps += len(first)
+        self.num_accepted += accepted
+        return accepted
+
+    @property
+    def acceptance_rate(self):
+        """
+        :return: Fraction of swaps accepted so far, nan before any swap
+        """
+        return self.num_accepted / self.num_swaps if self.num_swaps > 0 else float('nan')
+
+    @property
+    def assortativity(self):
+        """
+        :return: Degree assortativity of the current edges, same value as igraph's assortativity_degree
+        """
+        return _degree_assortativity(len(self.edges), self.degree_product_sum, self._square_sum, self._cube_sum)
+
+
+def _degree_power_sums(degrees):
+    """
+    :param degrees: Iterable of node degrees
+    :return: Tuple of ints, (sum of squared degrees, sum of cubed degrees)
+    """
+    degrees = [int(d) for d in degrees]
+    return sum(d ** 2 for d in degrees), sum(d ** 3 for d in degrees)
+
+
+def _degree_assortativity(num_edges, product_sum, square_sum, cube_sum):
+    """
+    Newman's degree assortativity from edge sums. Over the edges, sum of d_u + d_v is the sum of squared degrees and
+    sum of d_u^2 + d_v^2 the sum of cubed degrees, so only the sum of d_u * d_v depends on the edges themselves.
+    Scaled by 4 m^2, numerator and denominator are exact integers.
+
+    :param num_edges: Number of edges
+    :param product_sum: Sum of d_u * d_v over edges
+    :param square_sum: Sum of squared degrees
+    :param cube_sum: Sum of cubed degrees
+    :return: Assortativity coefficient, nan if every edge joins nodes of equal degree
+    """
+    denominator = 2 * num_edges * cube_sum - square_sum ** 2
+    if denominator == 0:
+        return float('nan')
+    return (4 * num_edges * product_sum - square_sum ** 2) / denominator
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _swap_driver(edges, table, shift, num_nodes, degrees, first, second, flips):
+    """
+    Jitted batch of stub-labeled double edge swaps, see AbstractMCMCSampler._swap
+
+    :param edges: m x 2 int64 edge array, modified in place
+    :param table: Hash set of edge keys, modified in place
+    :param shift: 64 - log2 of the table size
+    :param num_nodes: Number of nodes
+    :param degrees: int64 ndarray of node degrees
+    :param first: ndarray of first edge positions
+    :param second: ndarray of second edge draws in 0..m-2
+    :param flips: ndarray of uniforms
+    :return: Tuple, (number of accepted swaps, change in the sum of d_u * d_v over edges)
+    """
+    m = len(edges)
+    accepted = 0
+    delta = 0
+    for k in range(len(first)):
+        p1 = first[k]
+        p2 = second[k]
+        if p1 == p2:  # Prevents picking the same edge twice
+            p2 = m - 1
+        u = edges[p1, 0]
+        v = edges[p1, 1]
+        if flips[k] < 0.5:
+            x = edges[p2, 0]
+            y = edges[p2, 1]
+        else:
+            y = edges[p2, 0]
+            x = edges[p2, 1]
+
+        # ensure no multigraph
+        if _set_contains(table, shift, _edge_key(u, x, num_nodes)) or \
+                _set_contains(table, shift, _edge_key(v, y, num_nodes)):
+            continue
+        if u == v and x == y:
+            continue
+        # ensure no loops
+        if u == x or u == y or v == x or v == y:
+            continue
+
+        _set_remove(table, shift, _edge_key(u, v, num_nodes))
+        _set_remove(table, shift, _edge_key(x, y, num_nodes))
+        edges[p1, 1] = x
+        edges[p2, 0] = v
+        edges[p2, 1] = y
+        _set_insert(table, shift, _edge_key(u, x, num_nodes))
+        _set_insert(table, shift, _edge_key(v, y, num_nodes))
+        delta += degrees[u] * degrees[x] + degrees[v] * degrees[y] - degrees[u] * degrees[v] - degrees[x] * degrees[y]
+        accepted += 1
+    return accepted, delta
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _set_build(table, shift, edges, num_nodes):
+    """
+    Jitted insertion of every edge key
+
+    :param table: Empty hash set, modified in place
+    :param shift: 64 - log2 of the table size
+    :param edges: m x 2 int64 edge array
+    :param num_nodes: Number of nodes
+    """
+    for i in range(len(edges)):
+        _set_insert(table, shift, _edge_key(edges[i, 0], edges[i, 1], num_nodes))
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _edge_key(u, v, num_nodes):
+    """
+    :return: Key of the undirected edge (u, v), independent of orientation
+    """
+    if u > v:
+        return v * num_nodes + u
+    return u * num_nodes + v
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _set_slot(table, shift, key):
+    """
+    Jitted linear probe for a key. Home slots come from Fibonacci hashing, the top bits of key * 2^64 / phi.
+
+    :param table: Hash set, -1 marks an empty slot
+    :param shift: 64 - log2 of the table size
+    :param key: Non-negative key
+    :return: Slot holding the key, or the empty slot ending its probe sequence
+    """
+    mask = len(table) - 1
+    slot = np.int64((np.uint64(key) * np.uint64(11400714819323198485)) >> np.uint64(shift))
+    while table[slot] != -1 and table[slot] != key:
+        slot = (slot + 1) & mask
+    return slot
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _set_contains(table, shift, key):
+    return table[_set_slot(table, shift, key)] == key
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _set_insert(table, shift, key):
+    table[_set_slot(table, shift, key)] = key
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _set_remove(table, shift, key):
+    """
+    Jitted removal with backward shift, so lookups never need tombstones
+
+    :param table: Hash set, modified in place
+    :param shift: 64 - log2 of the table size
+    :param key: Key in the set
+    """
+    mask = len(table) - 1
+    hole = _set_slot(table, shift, key)
+    table[hole] = -1
+    slot = (hole + 1) & mask
+    while table[slot] != -1:
+        home = np.int64((np.uint64(table[slot]) * np.uint64(11400714819323198485)) >> np.uint64(shift))
+        # Move the entry back into the hole unless its home lies cyclically in (hole, slot]
+        if (slot - home) & mask >= (slot - hole) & mask:
+            table[hole] = table[slot]
+            table[slot] = -1
+            hole = slot
+        slot = (slot + 1) & mask
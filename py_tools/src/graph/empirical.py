@@ -1,4 +1,5 @@
 import networkx as nx
+import numpy as np
 import igraph
 
 
@@ -35,6 +36,39 @@ def igraph_from_gml(filepath):
     return G
 
 
+def edges_from_gml(filepath):
+    """
+    Reads GML file straight into an edge array, without building a networkx graph
+
+    :param filepath: Path of GML file
+    :return: Tuple, (number of nodes, m x 2 int64 ndarray of node ids)
+    """
+    return igraph_to_edges(igraph_from_gml(filepath))
+
+
+def igraph_to_edges(g):
+    """
+    Helper method convert undirected igraph graph to an edge array
+
+    :param g: igraph.Graph
+    :return: Tuple, (number of nodes, m x 2 int64 ndarray of node ids)
+    """
+    return g.vcount(), np.array(g.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+
+
+def networkx_to_edges(G):
+    """
+    Helper method convert undirected networkx graph to an edge array.
+    Nodes are numbered by their position in G, so arbitrary labels are allowed.
+
+    :param G: nx.Graph
+    :return: Tuple, (number of nodes, m x 2 int64 ndarray of node ids)
+    """
+    index = {v: i for i, v in enumerate(G)}
+    edges = np.fromiter((index[v] for e in G.edges for v in e), dtype=np.int64, count=2 * G.number_of_edges())
+    return len(index), edges.reshape(-1, 2)
+
+
 def networkx_to_igraph(G):
     """
     Helper method convert undirected networkx graph to igraph
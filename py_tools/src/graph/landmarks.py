@@ -0,0 +1,187 @@
+import numpy as np
+import numba as nb
+jit = nb.jit
+from .bidirectional_bfs import csr_from_igraph, _bidirectional_bfs_distance
+from .semisparse import _num_workers, _numba_threads
+
+
+class LandmarkOracle:
+    def __init__(self, g, num_landmarks=16, selection='degree', num_threads=1, seed=None):
+        """
+        Distance oracle backed by BFS tables from a few landmark nodes.
+        For a landmark l, |d(l,s) - d(l,t)| <= d(s,t) <= d(l,s) + d(l,t), so a query whose best lower and upper
+        bounds coincide is answered in O(num_landmarks) without any BFS. Other queries fall back to
+        bidirectional BFS, which stops early once its depth reaches the upper bound.
+
+        :param g: igraph.Graph
+        :param num_landmarks: Number of landmarks, capped by the number of nodes
+        :param selection: 'degree' for the highest degree nodes, 'random' for uniformly drawn nodes
+        :param num_threads: Number of threads to split BFSs across. If None, uses every thread available to numba
+        :param seed: Seed for 'random' selection
+        """
+        self.indptr, self.indices = csr_from_igraph(g)
+        self.num_nodes = len(self.indptr) - 1
+        self.num_threads = num_threads
+        num_landmarks = min(num_landmarks, self.num_nodes)
+        if selection == 'degree':
+            self.landmarks = np.argsort(-np.diff(self.indptr), kind='stable')[:num_landmarks]
+        elif selection == 'random':
+            self.landmarks = np.random.default_rng(seed).choice(self.num_nodes, num_landmarks, replace=False)
+        else:
+            raise ValueError('Unknown landmark selection: ' + str(selection))
+        self.landmarks = self.landmarks.astype(np.int64)
+
+        # Node-major, so the distances of one node to every landmark are contiguous
+        self.table = np.full((self.num_nodes, num_landmarks), -1, dtype=np.int32)
+        num_workers = _num_workers(num_threads, num_landmarks)
+        trackers = np.zeros((num_workers, self.num_nodes), dtype=self.indices.dtype)
+        with _numba_threads(num_workers):
+            _landmark_table_driver(self.indptr, self.indices, self.landmarks, self.table, trackers)
+
+        self.num_queries = 0
+        self.num_hits = 0
+
+    def bounds(self, pairs):
+        """
+        Landmark bounds on pair distances
+
+        :param pairs: k x 2 ndarray of (source, target) node ids
+        :return: ndarray of lower bounds, ndarray of upper bounds. Both are -1 for pairs in different components
+        """
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        lower = np.empty(len(pairs), dtype=np.int64)
+        upper = np.empty(len(pairs), dtype=np.int64)
+        _landmark_bounds_driver(self.table, pairs, self.num_nodes, lower, upper)
+        return lower, upper
+
+    def distances(self, pairs):
+        """
+        Exact pair distances. Updates num_queries and num_hits, the queries answered from the tables alone
+
+        :param pairs: k x 2 ndarray of (source, target) node ids
+        :return: 1d int64 ndarray of distances, -1 where the target can't be reached
+        """
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        num_workers = _num_workers(self.num_threads, len(pairs))
+        stamps = np.zeros((num_workers, 2, self.num_nodes), dtype=np.int32)
+        dists = np.zeros((num_workers, 2, self.num_nodes), dtype=np.int32)
+        queues = np.zeros((num_workers, 2, self.num_nodes), dtype=self.indices.dtype)
+        hits = np.zeros(len(pairs), dtype=np.bool_)
+        with _numba_threads(num_workers):
+            results = _landmark_query_driver(self.indptr, self.indices, self.table, pairs, stamps, dists, queues,
+                                             hits)
+        self.num_queries += len(pairs)
+        self.num_hits += int(np.count_nonzero(hits))
+        return results
+
+    @property
+    def hit_rate(self):
+        """
+        :return: Fraction of queries so far answered without BFS, nan before any query
+        """
+        return self.num_hits / self.num_queries if self.num_queries > 0 else float('nan')
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _landmark_table_driver(indptr, indices, landmarks, table, trackers):
+    """
+    Jitted driver filling the landmark table, one BFS per landmark.
+    Landmarks are dealt round-robin to one worker per row of trackers.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param landmarks: ndarray of landmark nodes
+    :param table: n x num_landmarks int32 ndarray filled with -1, modified in place
+    :param trackers: num_workers x n tracker ndarray
+    """
+    num_workers = trackers.shape[0]
+    for w in nb.prange(num_workers):
+        tracker = trackers[w]
+        for l in range(w, len(landmarks), num_workers):
+            tracker[0] = landmarks[l]
+            table[landmarks[l], l] = 0
+            pos = 0
+            end = 1
+            while pos < end:
+                node = tracker[pos]
+                pos += 1
+                for i in range(indptr[node], indptr[node + 1]):
+                    val = indices[i]
+                    if table[val, l] == -1:
+                        table[val, l] = table[node, l] + 1
+                        tracker[end] = val
+                        end += 1
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _landmark_bounds(table, s, t, num_nodes):
+    """
+    Jitted triangle-inequality bounds from every landmark
+
+    :param table: n x num_landmarks landmark distances, -1 where unreachable
+    :param s: Source node
+    :param t: Target node
+    :param num_nodes: Number of nodes, a bound no distance reaches
+    :return: Tuple, (lower, upper). (-1, -1) if a landmark shows s and t are in different components
+    """
+    lower = 0
+    upper = num_nodes
+    for l in range(table.shape[1]):
+        ds = table[s, l]
+        dt = table[t, l]
+        if ds == -1 and dt == -1:
+            continue
+        if ds == -1 or dt == -1:
+            return -1, -1
+        lower = max(lower, abs(ds - dt))
+        upper = min(upper, ds + dt)
+    return lower, upper
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _landmark_bounds_driver(table, pairs, num_nodes, lower, upper):
+    """
+    Jitted driver for landmark bounds of many pairs
+
+    :param table: n x num_landmarks landmark distances
+    :param pairs: k x 2 ndarray of (source, target) node ids
+    :param num_nodes: Number of nodes
+    :param lower: 1d int64 ndarray, modified in place
+    :param upper: 1d int64 ndarray, modified in place
+    """
+    for k in nb.prange(len(pairs)):
+        lower[k], upper[k] = _landmark_bounds(table, pairs[k, 0], pairs[k, 1], num_nodes)
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _landmark_query_driver(indptr, indices, table, pairs, stamps, dists, queues, hits):
+    """
+    Jitted driver for oracle queries. Pairs are dealt round-robin to one worker per row of stamps.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param table: n x num_landmarks landmark distances
+    :param pairs: k x 2 ndarray of (source, target) node ids
+    :param stamps: num_workers x 2 x n int32 visit stamps, zeroed
+    :param dists: num_workers x 2 x n int32 distance buffers
+    :param queues: num_workers x 2 x n queue buffers
+    :param hits: 1d bool ndarray, set where a query needed no BFS
+    :return: 1d int64 ndarray of distances, -1 where the target can't be reached
+    """
+    num_workers = stamps.shape[0]
+    num_nodes = len(indptr) - 1
+    results = np.empty(len(pairs), dtype=np.int64)
+    for w in nb.prange(num_workers):
+        epoch = 0
+        for k in range(w, len(pairs), num_workers):
+            s = pairs[k, 0]
+            t = pairs[k, 1]
+            lower, upper = _landmark_bounds(table, s, t, num_nodes)
+            if s == t or lower == upper:
+                results[k] = 0 if s == t else lower
+                hits[k] = True
+            else:
+                epoch += 1
+                results[k] = _bidirectional_bfs_distance(indptr, indices, s, t, stamps[w], epoch, dists[w],
+                                                         queues[w], upper)
+    return results
@@ -1,6 +1,9 @@
 import networkx as nx
+import igraph
 from abc import ABC, abstractmethod
 from .empirical import networkx_to_igraph, igraph_to_networkx
+from .double_edge_swap import DoubleEdgeSwapEngine, _degree_assortativity, _degree_power_sums
+from ..utils.block_rng import as_rng
 import numpy as np
 import numba as nb
 jit = nb.jit
@@ -8,24 +11,47 @@ jit = nb.jit
 
 class AbstractMCMCSampler(ABC):
     @abstractmethod
-    def __init__(self, G, burn_swaps=None, convergence_threshold=0.05, mixing_swaps=None, p=1):
+    def __init__(self, G, burn_swaps=None, convergence_threshold=0.05, mixing_swaps=None, p=1, rng=None,
+                 backend='networkx'):
         """
         :param G: nx.Graph
         :param burn_swaps: Number of swaps for burn-in. If None, uses convergence threshold
         :param convergence_threshold: Threshold for KL-divergence for burn-in
         :param mixing_swaps: Number of swaps between samples. If falsey, default to 2m
         :param p: Probability of performing normal double edge swaps
+        :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+        :param backend: 'networkx' to swap edges of G one at a time,
+                        'numba' to run batches of swaps on an edge array with DoubleEdgeSwapEngine. Only supports p=1
         """
-        self._G = G
         self._p = p
-
-        # Precomputations
-        self._edges = list([e for e in self._G.edges])
-        self._edges_dict = {frozenset(e): i for i, e in enumerate(self._edges)}
-        self._edge_indices = list(range(self._G.number_of_edges()))
-        self._m = len(self._edges)
-        self._n = len(self._G)
-        self._degrees = [x[1] for x in sorted(list(G.degree), key=lambda x: x[0])]
+        self._rng = as_rng(rng)
+        self._m = G.number_of_edges()
+        self._n = len(G)
+
+        if backend == 'networkx':
+            self._engine = None
+            self._G = G
+
+            # Precomputations
+            self._edges = list([e for e in self._G.edges])
+            self._edges_dict = {frozenset(e): i for i, e in enumerate(self._edges)}
+            self._edge_indices = list(range(self._G.number_of_edges()))
+            self._degrees = [x[1] for x in sorted(list(G.degree), key=lambda x: x[0])]
+
+            # Swaps keep degrees, so degree assortativity only needs the sum of d_u * d_v over edges kept up to date
+            self._degree_of = dict(G.degree)
+            self._degree_product_sum = sum(self._degree_of[u] * self._degree_of[v] for u, v in self._edges)
+            self._square_sum, self._cube_sum = _degree_power_sums(self._degree_of.values())
+        elif backend == 'numba':
+            if p != 1:
+                raise ValueError('Local swaps (p != 1) are only implemented by the networkx backend')
+            # The engine's edge array is the only state. Swaps run on node positions, edge i starts as edge i of G
+            self._G = None
+            self._nodes = list(G.nodes)
+            positions = {node: i for i, node in enumerate(self._nodes)}
+            self._engine = DoubleEdgeSwapEngine(self._n, [(positions[u], positions[v]) for u, v in G.edges])
+        else:
+            raise ValueError('Unknown MCMC backend: ' + str(backend))
 
         if mixing_swaps:
             self._mixing_swaps = mixing_swaps
@@ -33,8 +59,7 @@ class AbstractMCMCSampler(ABC):
             self._mixing_swaps = 2*self._m
 
         if burn_swaps is not None:
-            for _ in range(burn_swaps):
-                self._swap()
+            self._run_swaps(burn_swaps)
         else:
             if not convergence_threshold:
                 print('Convergence threshold not defined')
@@ -58,9 +83,8 @@ class AbstractMCMCSampler(ABC):
         def populate_assortativities():
             assort_arr = []
             for _ in range(samples_per_group):
-                for _ in range(int(np.ceil(t/samples_per_group))):
-                    self._swap()
-                assort_arr.append(networkx_to_igraph(self._G).assortativity_degree(directed=False))
+                self._run_swaps(int(np.ceil(t/samples_per_group)))
+                assort_arr.append(self._assortativity())
             return assort_arr
 
         t = self._m  # Number of swaps in a "group"
@@ -77,19 +101,60 @@ class AbstractMCMCSampler(ABC):
         # Return for debugging purposes
         return total_swaps, total_swaps/self._m
 
+    def _run_swaps(self, num_swaps, local=False):
+        """
+        Runs swaps on the current backend
+
+        :param num_swaps: Number of swaps
+        :param local: Use _local_swap instead of _swap. Same thing for p=1, the only setting of the numba backend
+        """
+        if self._engine is not None:
+            self._engine.run(num_swaps, self._rng)
+            return
+        swap = self._local_swap if local else self._swap
+        for _ in range(num_swaps):
+            swap()
+
+    def _assortativity(self):
+        """
+        :return: Degree assortativity of the current state, tracked through swaps instead of recomputed
+        """
+        if self._engine is not None:
+            return self._engine.assortativity
+        return _degree_assortativity(self._m, self._degree_product_sum, self._square_sum, self._cube_sum)
+
+    def _current_graph(self):
+        """
+        :return: nx.Graph of the current state. For the numba backend, a new graph built from the edge array
+        """
+        if self._engine is None:
+            return self._G
+        G = nx.Graph()
+        G.add_nodes_from(self._nodes)
+        G.add_edges_from((self._nodes[u], self._nodes[v]) for u, v in self._engine.edges.tolist())
+        return G
+
+    def _current_igraph(self):
+        """
+        :return: igraph.Graph of the current state
+        """
+        if self._engine is None:
+            return networkx_to_igraph(self._G)
+        return igraph.Graph(n=self._n, edges=self._engine.edges.tolist(), directed=False)
+
     def _swap(self):
         """
         Perform one stub-labeled double-edge swap as specified in Fosdick et. al.
         Modification of Fosdick et. al. code https://github.com/joelnish/double-edge-swap-mcmc/blob/master/dbl_edge_mcmc.py
         :return:
         """
-        p1 = np.random.randint(self._m)
-        p2 = np.random.randint(self._m - 1)
+        p1 = self._rng.integers(self._m)
+        p2 = self._rng.integers(self._m - 1)
         if p1 == p2:  # Prevents picking the same edge twice
             p2 = self._m - 1
 
         u, v = self._edges[p1]
-        if np.random.rand() < 0.5:
+        if self._rng.random() < 0.5:
             x, y = self._edges[p2]
         else:
             y, x = self._edges[p2]
@@ -118,6 +183,9 @@ class AbstractMCMCSampler(ABC):
         self._edges_dict[frozenset((u, x))] = p1
         self._edges_dict[frozenset((v, y))] = p2
 
+        d = self._degree_of
+        self._degree_product_sum += d[u] * d[x] + d[v] * d[y] - d[u] * d[v] - d[x] * d[y]
+
     def _local_swap(self):
         """
         Modified double edge swap w/ "localization" feature
@@ -126,7 +194,7 @@ class AbstractMCMCSampler(ABC):
         """
         def _choose_edge():
             while True:
-                n1 = np.random.randint(self._n)
+                n1 = self._rng.integers(self._n)
                 if len(self._G[n1]) > 0:
                     break
 
@@ -141,14 +209,14 @@ class AbstractMCMCSampler(ABC):
             return tuple(sorted((n1, n2)))
 
         # Short circuit for testing & minor performance improvement
-        if (self._p == 1) or (np.random.rand() < self._p):
+        if (self._p == 1) or (self._rng.random() < self._p):
             self._swap()
             return
 
         u, v = _choose_edge()
         x, y = _choose_edge()
 
-        if np.random.rand() < 0.5:
+        if self._rng.random() < 0.5:
             tmp = x
             x = y
             y = tmp
@@ -177,48 +245,57 @@ class AbstractMCMCSampler(ABC):
         self._edges_dict[frozenset((u, x))] = p1
         self._edges_dict[frozenset((v, y))] = p2
 
+        d = self._degree_of
+        self._degree_product_sum += d[u] * d[x] + d[v] * d[y] - d[u] * d[v] - d[x] * d[y]
+
 
 class MCMCSampler(AbstractMCMCSampler):
-    def __init__(self, g, burn_swaps=None, convergence_threshold=0.05, mixing_swaps=None, p=1):
+    def __init__(self, g, burn_swaps=None, convergence_threshold=0.05, mixing_swaps=None, p=1, rng=None,
+                 backend='networkx'):
         """
         :param g: igraph.Graph
         :param burn_swaps: Number of swaps for burn-in. If falsey, uses convergence threshold
         :param convergence_threshold: Threshold for mean difference for burn-in purposes
         :param mixing_swaps: Number of swaps between samples. If falsey, default to 2m
+        :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+        :param backend: 'networkx' or 'numba', see AbstractMCMCSampler
         """
         # Networkx version of graph
         super().__init__(igraph_to_networkx(g), burn_swaps=burn_swaps,
-                         convergence_threshold=convergence_threshold, mixing_swaps=mixing_swaps, p=p)
+                         convergence_threshold=convergence_threshold, mixing_swaps=mixing_swaps, p=p, rng=rng,
+                         backend=backend)
 
     def get_new_sample(self):
         """
         Mix self._G for self._mixing_swaps and return sample
         """
-        for _ in range(self._mixing_swaps):
-            self._local_swap()
+        self._run_swaps(self._mixing_swaps, local=True)
 
-        return networkx_to_igraph(self._G)
+        return self._current_igraph()
 
 
 class MCMCSamplerNX(AbstractMCMCSampler):
-    def __init__(self, G, burn_swaps=None, convergence_threshold=0.05, mixing_swaps=None, p=1):
+    def __init__(self, G, burn_swaps=None, convergence_threshold=0.05, mixing_swaps=None, p=1, rng=None,
+                 backend='networkx'):
         """
         :param G: nx.Graph
         :param burn_swaps: Number of swaps for burn-in. If falsey, uses convergence threshold
         :param convergence_threshold: Threshold for mean difference for burn-in purposes
         :param mixing_swaps: Number of swaps between samples. If falsey, default to 2m
+        :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+        :param backend: 'networkx' or 'numba', see AbstractMCMCSampler
         """
         super().__init__(G, burn_swaps=burn_swaps,
-                         convergence_threshold=convergence_threshold, mixing_swaps=mixing_swaps, p=p)
+                         convergence_threshold=convergence_threshold, mixing_swaps=mixing_swaps, p=p, rng=rng,
+                         backend=backend)
 
     def get_new_sample(self):
         """
         Mix self._G for self._mixing_swaps and return sample
         """
-        for _ in range(self._mixing_swaps):
-            self._local_swap()
+        self._run_swaps(self._mixing_swaps, local=True)
 
-        return self._G
+        return self._current_graph()
 
 
 # Fosdick et. al. code for testing
@@ -1,29 +1,130 @@
 import networkx as nx
 import numpy as np
-from collections import Counter
-from .bidirectional_bfs import bidirectional_bfs_distance_networkx, bidirectional_bfs_distance_igraph
+import numba as nb
+jit = nb.jit
+import os
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from .bidirectional_bfs import bidirectional_bfs_distance_networkx, bidirectional_bfs_distance_igraph, \
+    csr_from_igraph, distances, _pair_distances
+from .semisparse import SMALL_COMPONENT_SIZE, _bfs_histogram, _component_ranges, _distance_dtype, _num_workers, \
+    _numba_threads, _small_components_driver, _sum_of_histogram
+from ..utils.block_rng import as_rng
+from ..utils.running_statistics import RunningStatistics
 
 
-def threshold_sampler_igraph(g, threshold=0.1, batch_size=1000):
+def threshold_sampler_igraph(g, threshold=0.1, batch_size=1000, engine='python', rng=None):
     """
     :param G: igraph.Graph
     :param threshold: Threshold value
     :param batch_size: Number of samples to take before re-evaluating
+    :param engine: 'python' for bidirectional_bfs_distance_igraph, 'numba' for jitted bidirectional_bfs.distances
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
     :return: List of samples
     """
     s1 = []
     s2 = []
     half_batch = int(batch_size/2)
+    # Build the CSR adjacency and component node arrays once rather than per batch
+    graph = _distance_graph(g, engine)
+    components = _component_nodes_igraph(g)
     threshold_met = False
     while not threshold_met:
-        s1.extend(sampler_no_rejection_igraph(g, half_batch))
-        s2.extend(sampler_no_rejection_igraph(g, half_batch))
+        s1.extend(_sample_distances(graph, components, half_batch, rng))
+        s2.extend(_sample_distances(graph, components, half_batch, rng))
         if np.abs(np.mean(s1) - np.mean(s2)) < threshold:
             threshold_met = True
     return s1 + s2
 
 
-def sampler_no_rejection_igraph(g, num_samples):
+def confidence_sampler_igraph(g, tolerance=0.01, relative=True, confidence=0.95, batch_size=1000, engine='numba',
+                              max_samples=None, rng=None):
+    """
+    Samples pairwise distances until the confidence interval of the MGD estimate is narrow enough.
+    Mean and variance are streamed with RunningStatistics, so each batch costs O(batch_size) to check.
+
+    :param g: igraph.Graph
+    :param tolerance: Largest accepted half-width of the confidence interval
+    :param relative: If True, tolerance is relative to the estimate, otherwise absolute
+    :param confidence: Confidence level of the interval
+    :param batch_size: Number of samples to take before re-evaluating
+    :param engine: 'python' for bidirectional_bfs_distance_igraph, 'numba' for jitted bidirectional_bfs.distances
+    :param max_samples: Optional cap on the number of samples, the interval may then be wider than tolerance
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+    :return: Tuple, (MGD estimate, (CI low, CI high), number of samples)
+    """
+    # Return early if graph too small
+    if g.vcount() == 0 or g.vcount() == 1:
+        return 0.0, (0.0, 0.0), 0
+
+    graph = _distance_graph(g, engine)
+    components = _component_nodes_igraph(g)
+    statistics = RunningStatistics()
+    while max_samples is None or statistics.n < max_samples:
+        num_samples = batch_size if max_samples is None else min(batch_size, max_samples - statistics.n)
+        statistics.add_batch(_sample_distances(graph, components, num_samples, rng))
+        limit = tolerance * abs(statistics.mean) if relative else tolerance
+        # A constant sample has zero variance, so any interval check passes once there are two samples
+        if statistics.n >= 2 and statistics.half_width(confidence) <= limit:
+            break
+    return statistics.mean, statistics.confidence_interval(confidence), statistics.n
+
+
+def parallel_threshold_sampler_igraph(g, threshold=0.1, batch_size=1000, num_workers=None, seed=None):
+    """
+    Parallel threshold_sampler_igraph, fanning batches out to a thread pool running the jitted nogil engine.
+    Batch b draws its pairs from its own np.random.Generator, seeded by the b-th child of one SeedSequence,
+    and batches are merged and checked against the threshold strictly in batch order.
+    Samples therefore only depend on the seed, not on num_workers or on which thread ran which batch.
+
+    :param g: igraph.Graph
+    :param threshold: Threshold value
+    :param batch_size: Number of samples to take before re-evaluating
+    :param num_workers: Number of threads. If None, uses every CPU
+    :param seed: Seed for the SeedSequence. If None, uses fresh entropy
+    :return: List of samples
+    """
+    indptr, indices = csr_from_igraph(g)
+    component_nodes, starts, sizes = _component_nodes_igraph(g)
+    num_nodes = len(indptr) - 1
+    half_batch = int(batch_size/2)
+    seed_sequence = np.random.SeedSequence(seed)
+    # Scratch buffers are reused by every batch a thread runs
+    buffers = threading.local()
+
+    def run_batch(child):
+        if not hasattr(buffers, 'stamp'):
+            buffers.stamp = np.zeros((2, num_nodes), dtype=np.int32)
+            buffers.dist = np.zeros((2, num_nodes), dtype=np.int32)
+            buffers.queue = np.zeros((2, num_nodes), dtype=indices.dtype)
+        rng = np.random.default_rng(child)
+        halves = []
+        for _ in range(2):
+            sources, targets = _sample_node_pairs(component_nodes, starts, sizes, half_batch, rng)
+            halves.append(_pair_distances(indptr, indices, np.column_stack((sources, targets)), buffers.stamp,
+                                          buffers.dist, buffers.queue).tolist())
+        return halves
+
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    s1 = []
+    s2 = []
+    with ThreadPoolExecutor(num_workers) as executor:
+        # Children are spawned in batch order, whatever the number of batches in flight
+        pending = deque(executor.submit(run_batch, child) for child in seed_sequence.spawn(num_workers))
+        while True:
+            first, second = pending.popleft().result()
+            s1.extend(first)
+            s2.extend(second)
+            if np.abs(np.mean(s1) - np.mean(s2)) < threshold:
+                for future in pending:
+                    future.cancel()
+                return s1 + s2
+            pending.append(executor.submit(run_batch, seed_sequence.spawn(1)[0]))
+
+
+def sampler_no_rejection_igraph(g, num_samples, engine='python', rng=None):
     """
     igraph version of "no-rejection" sampler for pairwise distances.
     Chooses connected component i with probability proportional to n_i^2.
@@ -31,23 +132,334 @@ def sampler_no_rejection_igraph(g, num_samples):
 
     :param g: igraph.Graph
     :param num_samples: Number of samples
+    :param engine: 'python' for bidirectional_bfs_distance_igraph, 'numba' for jitted bidirectional_bfs.distances
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
     :return: List of pairwise distances
     """
     # Return early if graph too small
     if g.vcount() == 0 or g.vcount() == 1:
         return
 
-    tracker = []
-    components, probabilities = _component_probability_generator_igraph(g)
-    num_components = len(components)
-    for x in range(num_samples):
-        subgraph_index = np.random.choice(num_components, p=probabilities)
-        i, j = np.random.choice(components[subgraph_index], 2, replace=True)
-        tracker.append(bidirectional_bfs_distance_igraph(g, i, j))
+    return _sample_distances(_distance_graph(g, engine), _component_nodes_igraph(g), num_samples, rng)
+
+
+def source_sampler_igraph(g, num_sources, num_targets=None, num_threads=1, rng=None):
+    """
+    Source-grouped sampler for mean geodesic distance.
+    Sources are drawn with the same marginal as the first node of sampler_no_rejection_igraph,
+    and one BFS per source answers every target: num_targets nodes drawn uniformly, with replacement,
+    from the source's component, or the whole component if num_targets is None.
+    Each source yields the mean distance to its targets, an unbiased estimate of MGD over the n_i^2 weighted pairs,
+    and the sources are independent, so their spread gives the standard error.
+
+    :param g: igraph.Graph
+    :param num_sources: Number of BFS sources, at least 2 for a standard error
+    :param num_targets: Number of targets per source. If None, uses every node in the source's component
+    :param num_threads: Number of threads to split sources across. If None, uses every thread available to numba
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+    :return: Tuple, (MGD estimate, standard error of estimate)
+    """
+    indptr, indices = csr_from_igraph(g)
+    component_nodes, starts, sizes = _component_nodes_igraph(g)
+    chosen = _sample_components(sizes, num_sources, rng)
+    offsets = starts[chosen]
+    sources = component_nodes[offsets + _randint(rng, sizes[chosen])]
+    if num_targets is None:
+        targets = np.zeros((num_sources, 0), dtype=np.int64)
+    else:
+        targets = component_nodes[offsets[:, None] + _randint(rng, sizes[chosen][:, None],
+                                                               size=(num_sources, num_targets))]
+
+    num_nodes = len(indptr) - 1
+    num_workers = _num_workers(num_threads, num_sources)
+    trackers = np.zeros((num_workers, num_nodes), dtype=indices.dtype)
+    stamps = np.zeros((num_workers, num_nodes), dtype=np.int32)
+    dists = np.zeros((num_workers, num_nodes), dtype=np.int32)
+    with _numba_threads(num_workers):
+        means = _source_mean_distances_driver(indptr, indices, sources, targets, trackers, stamps, dists)
+    if num_sources < 2:
+        return float(np.mean(means)), float('nan')
+    return float(np.mean(means)), float(np.std(means, ddof=1) / np.sqrt(num_sources))
+
+
+def pivot_sampler_igraph(g, num_pivots, num_threads=1, rng=None):
+    """
+    Pivot-source estimator of the distance distribution (Eppstein-Wang).
+    Pivots are drawn uniformly without replacement from all nodes, and a full BFS from each one gives
+    the number of nodes at every distance from it. Summed over every node these counts make the exact histogram,
+    so n/k times their sum over k pivots is an unbiased estimate of it, with finite population correction
+    in the standard errors. With num_pivots = n the estimate is exact.
+    Follows the convention of semisparse.all_pairs_shortest_paths: ordered pairs within components,
+    self pairs included at distance 0.
+
+    :param g: igraph.Graph
+    :param num_pivots: Number of BFS sources, capped by the number of nodes. At least 2 for standard errors
+    :param num_threads: Number of threads to split pivots across. If None, uses every thread available to numba
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+    :return: Tuple, (float ndarray of estimated pair counts indexed by distance, ndarray of their standard errors)
+    """
+    indptr, indices = csr_from_igraph(g)
+    num_nodes = len(indptr) - 1
+    if num_nodes <= 1:
+        return np.full(1, float(num_nodes)), np.zeros(1)
+    num_pivots = min(num_pivots, num_nodes)
+    pivots = as_rng(rng).choice(num_nodes, num_pivots, replace=False)
+
+    num_workers = _num_workers(num_threads, num_pivots)
+    trackers = np.zeros((num_workers, num_nodes), dtype=indices.dtype)
+    stamps = np.zeros((num_workers, num_nodes), dtype=np.int32)
+    # Histograms only need to reach the largest diameter, not n
+    num_bins = _diameter_bound(indptr, indices, trackers[0], stamps[0]) + 1
+    with _numba_threads(num_workers):
+        sums, squares = _pivot_histograms_driver(indptr, indices, pivots, trackers, stamps, num_bins)
+    num_bins = int(np.flatnonzero(sums)[-1]) + 1
+    sums = sums[:num_bins].astype(np.float64)
+    squares = squares[:num_bins].astype(np.float64)
+
+    estimate = num_nodes * sums / num_pivots
+    if num_pivots < 2:
+        return estimate, np.full(num_bins, float('nan'))
+    variance = np.maximum(squares - sums ** 2 / num_pivots, 0) / (num_pivots - 1)
+    correction = 1 - num_pivots / num_nodes
+    return estimate, num_nodes * np.sqrt(correction * variance / num_pivots)
+
+
+def stratified_sampler_igraph(g, num_samples, cutoff=SMALL_COMPONENT_SIZE, pilot_samples=100, num_threads=1,
+                              rng=None):
+    """
+    Stratified estimator of mean geodesic distance, with every connected component as a stratum.
+    Components of at most cutoff nodes are summed exactly by the batched APSP kernel.
+    Only the larger ones are sampled, with uniform pairs within the component. A pilot of pilot_samples pairs
+    per component estimates each spread sigma_i, then the rest of the budget follows Neyman allocation,
+    proportional to n_i^2 sigma_i. Component means are combined with weights n_i^2 / sum_j n_j^2,
+    as in sampler_no_rejection_igraph, but without spending samples on the exact components or on
+    the variance between components.
+
+    :param g: igraph.Graph
+    :param num_samples: Number of pairs sampled over all large components, pilots included
+    :param cutoff: Largest component size computed exactly
+    :param pilot_samples: Number of pilot pairs per large component, at least 2
+    :param num_threads: Number of threads for the exact kernel and pair distances.
+                        If None, uses every thread available to numba
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+    :return: Tuple, (MGD estimate, standard error of estimate). The standard error is 0 if every component is exact
+    """
+    num_nodes = g.vcount()
+    if num_nodes <= 1:
+        return 0.0, 0.0
+    indptr, indices, bounds = _component_ranges(num_nodes, g.get_edgelist())
+    sizes = np.diff(bounds)
+    weights = sizes.astype(np.float64) ** 2 / np.sum(sizes.astype(np.int64) ** 2)
+    num_large = int(np.count_nonzero(sizes > cutoff))
+
+    estimate = 0.0
+    if num_large < len(sizes):
+        # Exact sum of distances over the small components, see semisparse._component_histograms
+        small_bounds = bounds[num_large:]
+        max_size = int(sizes[num_large])
+        num_workers = _num_workers(num_threads, len(small_bounds) - 1)
+        trackers = np.full((num_workers, max_size), -1, dtype=indices.dtype)
+        stamps = np.zeros((num_workers, max_size), dtype=np.int32)
+        dists = np.zeros((num_workers, max_size), dtype=_distance_dtype(max_size))
+        with _numba_threads(num_workers):
+            histogram = _small_components_driver(indptr, indices, small_bounds, trackers, stamps, dists, max_size,
+                                                 False)
+        estimate += _sum_of_histogram(histogram) / np.sum(sizes.astype(np.int64) ** 2)
+    if num_large == 0:
+        return float(estimate), 0.0
+
+    def sample(c, num_pairs):
+        # Rebase the component's rows so it is a standalone CSR adjacency
+        lo, hi = bounds[c], bounds[c + 1]
+        graph = (indptr[lo:hi + 1] - indptr[lo], indices[indptr[lo]:indptr[hi]])
+        return distances(graph, _randint(rng, sizes[c], size=(num_pairs, 2)), num_threads=num_threads)
+
+    statistics = [RunningStatistics() for _ in range(num_large)]
+    pilot = max(2, min(pilot_samples, num_samples // num_large))
+    for c in range(num_large):
+        statistics[c].add_batch(sample(c, pilot))
+    remaining = num_samples - pilot * num_large
+    if remaining > 0:
+        spreads = weights[:num_large] * np.sqrt([s.variance for s in statistics])
+        if not np.any(spreads):
+            spreads = weights[:num_large]
+        allocation = _allocate(remaining, spreads / np.sum(spreads))
+        for c in range(num_large):
+            if allocation[c] > 0:
+                statistics[c].add_batch(sample(c, allocation[c]))
+
+    estimate += sum(weights[c] * s.mean for c, s in enumerate(statistics))
+    variance = sum(weights[c] ** 2 * s.variance / s.n for c, s in enumerate(statistics))
+    return float(estimate), float(np.sqrt(variance))
+
+
+def _allocate(num_samples, shares):
+    """
+    Splits a sample budget by shares, rounding so the parts add up to the budget (largest remainder method)
+
+    :param num_samples: Number of samples
+    :param shares: ndarray of shares summing to 1
+    :return: int64 ndarray of parts
+    """
+    exact = num_samples * shares
+    parts = np.floor(exact).astype(np.int64)
+    leftover = num_samples - int(np.sum(parts))
+    parts[np.argsort(parts - exact, kind='stable')[:leftover]] += 1
+    return parts
+
+
+def short_distance_sampler_igraph(g, num_samples, batch_size=1000, num_threads=1, rng=None):
+    """
+    MGD estimator that counts pairs at distance at most 2 exactly and samples only the rest.
+    A jitted two-hop sweep counts, for every node, its distinct neighbors and the distinct nodes exactly two hops
+    away, which covers all pairs at distances 0, 1 and 2. Pairs are then drawn as in sampler_no_rejection_igraph,
+    pairs closer than 3 are rejected, and the accepted ones estimate the mean of the residual distribution.
+    Only the residual share of pairs carries sampling error, so dense graphs, where most pairs are 1 or 2 apart,
+    need far fewer samples for the same precision.
+
+    :param g: igraph.Graph
+    :param num_samples: Number of residual pairs to sample, at least 2 for a standard error
+    :param batch_size: Number of pairs drawn at a time
+    :param num_threads: Number of threads for the two-hop sweep and pair distances.
+                        If None, uses every thread available to numba
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+    :return: Tuple, (MGD estimate, standard error of estimate). The standard error is 0 if no pair is 3 or more apart
+    """
+    num_nodes = g.vcount()
+    if num_nodes <= 1:
+        return 0.0, 0.0
+    indptr, indices = csr_from_igraph(g)
+    component_nodes, starts, sizes = _component_nodes_igraph(g)
+    num_pairs = int(np.sum(sizes.astype(np.int64) ** 2))
+
+    num_workers = _num_workers(num_threads, num_nodes)
+    stamps = np.zeros((num_workers, num_nodes), dtype=np.int32)
+    with _numba_threads(num_workers):
+        num_adjacent, num_two_hops = _two_hop_counts_driver(indptr, indices, stamps)
+    num_residual = num_pairs - num_nodes - num_adjacent - num_two_hops
+    estimate = (num_adjacent + 2 * num_two_hops) / num_pairs
+    if num_residual == 0:
+        return float(estimate), 0.0
+
+    graph = (indptr, indices)
+    statistics = RunningStatistics()
+    while statistics.n < num_samples:
+        sources, targets = _sample_node_pairs(component_nodes, starts, sizes, batch_size, rng)
+        samples = distances(graph, np.column_stack((sources, targets)), num_threads=num_threads)
+        statistics.add_batch(samples[samples >= 3][:num_samples - statistics.n])
+    share = num_residual / num_pairs
+    return float(estimate + share * statistics.mean), float(share * statistics.standard_error)
+
 
+def _distance_graph(g, engine):
+    """
+    Graph representation the distance engine works on
+
+    :param g: igraph.Graph
+    :param engine: 'python' or 'numba'
+    :return: g for 'python', CSR tuple for 'numba'
+    """
+    if engine == 'python':
+        return g
+    elif engine == 'numba':
+        return csr_from_igraph(g)
+    else:
+        raise ValueError('Unknown distance engine: ' + str(engine))
+
+
+def _sample_distances(graph, components, num_samples, rng=None):
+    """
+    Distances between a batch of node pairs drawn by _sample_node_pairs_igraph
+
+    :param graph: igraph.Graph, or its CSR tuple to use the jitted engine
+    :param components: Tuple, (component_nodes, starts, sizes) from _component_nodes_igraph, computed once per graph
+    :param num_samples: Number of samples
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+    :return: List of pairwise distances
+    """
+    sources, targets = _sample_node_pairs(*components, num_samples, rng)
+    if isinstance(graph, tuple):
+        return distances(graph, np.column_stack((sources, targets))).tolist()
+
+    tracker = []
+    for i, j in zip(sources.tolist(), targets.tolist()):
+        tracker.append(bidirectional_bfs_distance_igraph(graph, i, j))
     return tracker
 
 
+def _sample_node_pairs_igraph(g, num_samples, rng=None):
+    """
+    Draws a batch of node pairs at once, same distribution as one np.random.choice over components per sample.
+    Component i is chosen with probability n_i^2 / sum_j n_j^2 by searching the cumulative squared sizes,
+    then both nodes are drawn uniformly, with replacement, from the component's slice of a node array.
+
+    :param g: igraph.Graph
+    :param num_samples: Number of pairs
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+    :return: ndarray of first nodes, ndarray of second nodes
+    """
+    return _sample_node_pairs(*_component_nodes_igraph(g), num_samples, rng)
+
+
+def _sample_node_pairs(component_nodes, starts, sizes, num_samples, rng=None):
+    """
+    Draws node pairs from components grouped by _component_nodes_igraph, see _sample_node_pairs_igraph
+
+    :param component_nodes: ndarray of nodes grouped by component
+    :param starts: ndarray of component starts in component_nodes
+    :param sizes: ndarray of component sizes
+    :param num_samples: Number of pairs
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+    :return: ndarray of first nodes, ndarray of second nodes
+    """
+    chosen = _sample_components(sizes, num_samples, rng)
+    offsets = starts[chosen]
+    sources = component_nodes[offsets + _randint(rng, sizes[chosen])]
+    targets = component_nodes[offsets + _randint(rng, sizes[chosen])]
+    return sources, targets
+
+
+def _component_nodes_igraph(g):
+    """
+    Nodes grouped by connected component
+
+    :param g: igraph.Graph
+    :return: ndarray of nodes, where component c is nodes[starts[c]:starts[c] + sizes[c]],
+             ndarray of starts, ndarray of sizes
+    """
+    membership = np.array(g.components().membership, dtype=np.int64)
+    sizes = np.bincount(membership)
+    component_nodes = np.argsort(membership, kind='stable')
+    starts = np.cumsum(sizes) - sizes
+    return component_nodes, starts, sizes
+
+
+def _sample_components(sizes, num_samples, rng=None):
+    """
+    Draws components with probability n_i^2 / sum_j n_j^2
+
+    :param sizes: ndarray of component sizes
+    :param num_samples: Number of draws
+    :param rng: utils.block_rng.BlockRNG or np.random.Generator. If None, uses the legacy global np.random state
+    :return: ndarray of component indices
+    """
+    # Integer weights keep the component probabilities exact
+    cumulative = np.cumsum(sizes ** 2)
+    return np.searchsorted(cumulative, _randint(rng, cumulative[-1], num_samples), side='right')
+
+
+def _randint(rng, high, size=None):
+    """
+    Uniform integers in [0, high), from a BlockRNG, a Generator or the legacy global state
+
+    :param rng: utils.block_rng.BlockRNG, np.random.Generator, or None for np.random
+    :param high: Exclusive upper bound, scalar or ndarray
+    :param size: Output shape. If None, the shape of high
+    :return: ndarray of int64
+    """
+    return as_rng(rng).integers(high, size)
+
+
 def _component_probability_generator_igraph(g):
     """
     Provides connected component list and probabilities for each component
@@ -65,3 +477,187 @@ def _component_probability_generator_igraph(g):
     tmp = [s ** 2 for s in component_sizes]
     probabilities = [n / sum(tmp) for n in tmp]
     return components, probabilities
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _source_mean_distances_driver(indptr, indices, sources, targets, trackers, stamps, dists):
+    """
+    Jitted driver for the source-grouped sampler. Sources are dealt round-robin to one worker per row of trackers.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param sources: ndarray of source nodes
+    :param targets: num_sources x k ndarray of targets. With k = 0, every node reached is a target
+    :param trackers: num_workers x n tracker ndarray
+    :param stamps: num_workers x n int32 visit stamps, zeroed
+    :param dists: num_workers x n int32 distance buffers
+    :return: 1d float ndarray, mean distance from each source to its targets
+    """
+    num_workers = trackers.shape[0]
+    means = np.empty(len(sources))
+    for w in nb.prange(num_workers):
+        tracker = trackers[w]
+        dist = dists[w]
+        epoch = 0
+        for k in range(w, len(sources), num_workers):
+            epoch += 1
+            num_reached = _bfs_fill_distances(indptr, indices, sources[k], tracker, stamps[w], epoch, dist)
+            total = 0
+            if targets.shape[1] == 0:
+                for pos in range(num_reached):
+                    total += dist[tracker[pos]]
+                means[k] = total / num_reached
+            else:
+                # Targets share the source's component, so every one of them was reached
+                for j in range(targets.shape[1]):
+                    total += dist[targets[k, j]]
+                means[k] = total / targets.shape[1]
+    return means
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _bfs_fill_distances(indptr, indices, source, tracker, stamp, epoch, dist):
+    """
+    Jitted BFS over the source's component.
+    A node is reached iff its stamp equals epoch, so buffers never need clearing between sources.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param source: Source node
+    :param tracker: Tracker ndarray, holds reached nodes in the order they're visited
+    :param stamp: Visit stamp ndarray, no entry may equal epoch on entry
+    :param epoch: Stamp of this BFS
+    :param dist: Distance ndarray, written for reached nodes
+    :return: Number of nodes reached, including the source
+    """
+    tracker[0] = source
+    stamp[source] = epoch
+    dist[source] = 0
+    end = 1
+    pos = 0
+    while pos < end:
+        node = tracker[pos]
+        pos += 1
+        for i in range(indptr[node], indptr[node + 1]):
+            val = indices[i]
+            if stamp[val] != epoch:
+                stamp[val] = epoch
+                dist[val] = dist[node] + 1
+                tracker[end] = val
+                end += 1
+    return end
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _pivot_histograms_driver(indptr, indices, pivots, trackers, stamps, num_bins):
+    """
+    Jitted driver for the pivot sampler. Pivots are dealt round-robin to one worker per row of trackers.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param pivots: ndarray of source nodes
+    :param trackers: num_workers x n tracker ndarray
+    :param stamps: num_workers x n int32 visit stamps, one row per worker. Cleared on entry
+    :param num_bins: Histogram length, must exceed the diameter of every component
+    :return: Tuple of 1d int64 ndarrays indexed by distance, (sum over pivots of the number of nodes
+             at each distance, sum over pivots of its square)
+    """
+    num_workers = trackers.shape[0]
+    num_nodes = len(indptr) - 1
+    sums = np.zeros((num_workers, num_bins), dtype=np.int64)
+    squares = np.zeros((num_workers, num_bins), dtype=np.int64)
+    histograms = np.zeros((num_workers, num_bins), dtype=np.int64)
+    for w in nb.prange(num_workers):
+        histogram = histograms[w]
+        stamps[w][:] = 0
+        epoch = 0
+        for k in range(w, len(pivots), num_workers):
+            epoch += 1
+            eccentricity = _bfs_histogram(indptr, indices, pivots[k], num_nodes, trackers[w], stamps[w], epoch,
+                                          histogram, 1)
+            for d in range(eccentricity + 1):
+                sums[w, d] += histogram[d]
+                squares[w, d] += histogram[d] * histogram[d]
+                histogram[d] = 0
+
+    total_sums = np.zeros(num_bins, dtype=np.int64)
+    total_squares = np.zeros(num_bins, dtype=np.int64)
+    for w in range(num_workers):
+        total_sums += sums[w]
+        total_squares += squares[w]
+    return total_sums, total_squares
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _diameter_bound(indptr, indices, tracker, stamp):
+    """
+    Jitted bound on the diameter of every component, from one BFS per component.
+    The eccentricity of any node bounds its component's diameter by twice itself, and the size by less than itself.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param tracker: Tracker ndarray
+    :param stamp: Visit stamp ndarray, modified
+    :return: Largest distance any pair can be apart
+    """
+    stamp[:] = 0
+    bound = 0
+    for root in range(len(indptr) - 1):
+        if stamp[root] == 1:
+            continue
+        stamp[root] = 1
+        tracker[0] = root
+        pos = 0
+        end = 1
+        eccentricity = 0
+        # Nodes at the current level are tracker[pos:level_end]
+        while pos < end:
+            level_end = end
+            while pos < level_end:
+                node = tracker[pos]
+                pos += 1
+                for i in range(indptr[node], indptr[node + 1]):
+                    val = indices[i]
+                    if stamp[val] != 1:
+                        stamp[val] = 1
+                        tracker[end] = val
+                        end += 1
+            if end > level_end:
+                eccentricity += 1
+        bound = max(bound, min(2 * eccentricity, end - 1))
+    return bound
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _two_hop_counts_driver(indptr, indices, stamps):
+    """
+    Jitted count of ordered pairs at distances 1 and 2. Nodes are dealt round-robin to one worker per row of stamps.
+    A node is marked iff its stamp equals the current epoch, so repeated neighbors and paths are counted once.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param stamps: num_workers x n int32 visit stamps, zeroed
+    :return: Tuple, (number of ordered pairs at distance 1, number of ordered pairs at distance 2)
+    """
+    num_workers = stamps.shape[0]
+    num_nodes = len(indptr) - 1
+    counts = np.zeros((num_workers, 2), dtype=np.int64)
+    for w in nb.prange(num_workers):
+        stamp = stamps[w]
+        for u in range(w, num_nodes, num_workers):
+            epoch = u + 1
+            stamp[u] = epoch
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                if stamp[v] != epoch:
+                    stamp[v] = epoch
+                    counts[w, 0] += 1
+            # Every neighbor is marked, so any unmarked node two hops away is exactly at distance 2
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                for j in range(indptr[v], indptr[v + 1]):
+                    x = indices[j]
+                    if stamp[x] != epoch:
+                        stamp[x] = epoch
+                        counts[w, 1] += 1
+    return np.sum(counts[:, 0]), np.sum(counts[:, 1])
@@ -0,0 +1,81 @@
+import numpy as np
+import numba as nb
+jit = nb.jit
+from scipy.sparse import csgraph, coo_matrix
+
+
+def node_order(num_nodes, edges, method):
+    """
+    Cache-friendly ordering of the nodes of an edge array.
+    Nodes that are visited together during BFS end up close in memory, so neighbor lookups stay local.
+
+    :param num_nodes: Number of nodes
+    :param edges: m x 2 ndarray of node ids in 0..n-1
+    :param method: 'bfs' for BFS order from the highest degree node of each component,
+                   'rcm' for reverse Cuthill-McKee order, 'degree' for descending degree order
+    :return: ndarray, old id of the node at each new position
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    heads = np.concatenate((edges[:, 0], edges[:, 1]))
+    tails = np.concatenate((edges[:, 1], edges[:, 0]))
+    A = coo_matrix((np.ones(len(heads), dtype=np.int8), (heads, tails)), shape=(num_nodes, num_nodes)).tocsr()
+    degrees = np.diff(A.indptr)
+    if method == 'bfs':
+        roots = np.argsort(-degrees, kind='stable')
+        return _bfs_order(A.indptr, A.indices, roots)
+    elif method == 'rcm':
+        return csgraph.reverse_cuthill_mckee(A, symmetric_mode=True).astype(np.int64)
+    elif method == 'degree':
+        return np.argsort(-degrees, kind='stable')
+    else:
+        raise ValueError('Unknown node order: ' + str(method))
+
+
+def reorder_edges(num_nodes, edges, method):
+    """
+    Relabels an edge array so node ids follow node_order
+
+    :param num_nodes: Number of nodes
+    :param edges: m x 2 ndarray of node ids in 0..n-1
+    :param method: 'bfs', 'rcm' or 'degree', see node_order
+    :return: m x 2 int64 ndarray of new node ids
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    order = node_order(num_nodes, edges, method)
+    new_ids = np.empty(num_nodes, dtype=np.int64)
+    new_ids[order] = np.arange(num_nodes)
+    return new_ids[edges]
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _bfs_order(indptr, indices, roots):
+    """
+    Jitted BFS visiting order over every component.
+    Each unvisited root, taken in order, starts a new BFS.
+
+    :param indptr: CSR row offsets
+    :param indices: CSR neighbor ids
+    :param roots: Candidate BFS roots, every node exactly once
+    :return: 1d int64 ndarray, nodes in visiting order
+    """
+    num_nodes = len(indptr) - 1
+    visited = np.zeros(num_nodes, dtype=np.uint8)
+    order = np.empty(num_nodes, dtype=np.int64)
+    end = 0
+    for root in roots:
+        if visited[root]:
+            continue
+        visited[root] = 1
+        pos = end
+        order[end] = root
+        end += 1
+        while pos < end:
+            node = order[pos]
+            pos += 1
+            for i in range(indptr[node], indptr[node + 1]):
+                val = indices[i]
+                if not visited[val]:
+                    visited[val] = 1
+                    order[end] = val
+                    end += 1
+    return order
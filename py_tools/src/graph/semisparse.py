@@ -1,157 +1,697 @@
-import networkx as nx
 import numpy as np
 import numba as nb
 jit = nb.jit
+import os
+import zlib
+from contextlib import contextmanager
 from collections import defaultdict
+from .empirical import networkx_to_edges
+from .reorder import reorder_edges
 
 
-def all_pairs_shortest_paths(G):
+def all_pairs_shortest_paths(G, num_threads=1, layout='csr', engine='bfs', collapse_twins=False, checkpoint=None,
+                             reorder=None):
     """
-    Driver function for fast APSP algorithm on simple graph with multiple disconnected components
+    Driver function for fast APSP algorithm on simple graph with multiple disconnected components.
+    Thin wrapper around all_pairs_shortest_paths_from_edges
 
     :param G: nx.Graph
+    :param num_threads: Number of threads to split BFS sources across within each component.
+                        If None, uses every thread available to numba
+    :param layout: Adjacency layout for the BFS kernels. 'csr' (default) or the padded 'semisparse' matrix
+    :param engine: 'bfs' for top-down BFS, 'hybrid' for direction-optimizing BFS,
+                   'bitparallel' for 64-source bit-parallel BFS
+    :param collapse_twins: Run one BFS per class of structural twins instead of one per node
+    :param checkpoint: Optional path of a checkpoint file. Progress is saved there periodically,
+                       and a rerun on the same graph resumes from it
+    :param reorder: Optional node relabeling applied before building the adjacency, for memory locality.
+                    'bfs', 'rcm' or 'degree', see reorder.node_order. Results don't depend on it
     :return: distribution dictionary with keys as distances and values as the number of distances
                 sum of values (number of paths) is\sum_{i}n_i^2
                 where n_i is the number of nodes in the ith connected component
 
+    """
+    num_nodes, edges = networkx_to_edges(G)
+    return all_pairs_shortest_paths_from_edges(num_nodes, edges, num_threads=num_threads, layout=layout,
+                                               engine=engine, collapse_twins=collapse_twins, checkpoint=checkpoint,
+                                               reorder=reorder)
+
+
+def all_pairs_shortest_paths_rolling_sum(G, num_threads=1, layout='csr', engine='bfs', collapse_twins=False,
+                                         checkpoint=None, reorder=None):
+    """
+    Driver function for fast APSP algorithm on simple graph with multiple disconnected components.
+    Sums the distance histogram instead of building a distribution dictionary.
+    Thin wrapper around all_pairs_shortest_paths_rolling_sum_from_edges
+
+    :param G: nx.Graph
+    :param num_threads: Number of threads to split BFS sources across within each component.
+                        If None, uses every thread available to numba
+    :param layout: Adjacency layout for the BFS kernels. 'csr' (default) or the padded 'semisparse' matrix
+    :param engine: 'bfs' for top-down BFS, 'hybrid' for direction-optimizing BFS,
+                   'bitparallel' for 64-source bit-parallel BFS
+    :param collapse_twins: Run one BFS per class of structural twins instead of one per node
+    :param checkpoint: Optional path of a checkpoint file. Progress is saved there periodically,
+                       and a rerun on the same graph resumes from it
+    :param reorder: Optional node relabeling applied before building the adjacency, for memory locality.
+                    'bfs', 'rcm' or 'degree', see reorder.node_order. Results don't depend on it
+    :return: Tuple, (num distances, sum distances)
+    """
+    num_nodes, edges = networkx_to_edges(G)
+    return all_pairs_shortest_paths_rolling_sum_from_edges(num_nodes, edges, num_threads=num_threads, layout=layout,
+                                                           engine=engine, collapse_twins=collapse_twins,
+                                                           checkpoint=checkpoint, reorder=reorder)
+
+
+def warmup():
+    """
+    Compiles, or loads from numba's on-disk cache, the APSP kernels for int32 CSR adjacency,
+    which is what every graph with fewer than 2^31 edges uses.
+    Meant for pool initializers, so workers don't pay for JIT compilation on their first graph.
+    """
+    # A triangle with a tail goes through the preprocessor, the lone edge through the small-component driver
+    edges = np.array([[0, 1], [1, 2], [2, 0], [2, 3], [4, 5]], dtype=np.int64)
+    for engine in ('bfs', 'hybrid', 'bitparallel'):
+        all_pairs_shortest_paths_rolling_sum_from_edges(6, edges, engine=engine)
+
+
+def all_pairs_shortest_paths_from_edges(num_nodes, edges, num_threads=1, layout='csr', engine='bfs',
+                                        collapse_twins=False, checkpoint=None, reorder=None):
+    """
+    Driver function for fast APSP algorithm on an edge array with multiple disconnected components
+
+    :param num_nodes: Number of nodes
+    :param edges: m x 2 ndarray of node ids in 0..n-1, e.g. from igraph.Graph.get_edgelist()
+    :param num_threads: Number of threads to split BFS sources across within each component.
+                        If None, uses every thread available to numba
+    :param layout: Adjacency layout for the BFS kernels. 'csr' (default) or the padded 'semisparse' matrix
+    :param engine: 'bfs', 'hybrid' or 'bitparallel'
+    :param collapse_twins: Run one BFS per class of structural twins instead of one per node
+    :param checkpoint: Optional path of a checkpoint file, see all_pairs_shortest_paths
+    :param reorder: Optional node relabeling, 'bfs', 'rcm' or 'degree', see all_pairs_shortest_paths
+    :return: distribution dictionary, same as all_pairs_shortest_paths
     """
     results = defaultdict(int)
-    if len(G) <= 1:
+    if num_nodes <= 1:
         results[0.0] += 1
         return results
-    if nx.is_connected(G):
-        res = _all_pairs_shortest_paths_preprocessor(G, rolling_sum=False)
-        for e in res:
-            results[e] += 1
-        return results
-    else:
-        gen = (G.subgraph(c) for c in nx.connected_components(G))
-        for g in gen:
-            if len(g) <= 1:
-                results[0.0] += 1
-            else:
-                res = _all_pairs_shortest_paths_preprocessor(g, rolling_sum=False)
-                if res is not None:
-                    for e in res:
-                        results[e] += 1
-        return results
+    _, histograms = _component_histograms(num_nodes, edges, num_threads=num_threads, layout=layout,
+                                          engine=engine, collapse_twins=collapse_twins, checkpoint=checkpoint,
+                                          reorder=reorder)
+    for histogram in histograms:
+        _add_histogram(results, histogram)
+    return results
 
 
-def all_pairs_shortest_paths_rolling_sum(G):
+def all_pairs_shortest_paths_rolling_sum_from_edges(num_nodes, edges, num_threads=1, layout='csr', engine='bfs',
+                                                    collapse_twins=False, checkpoint=None, reorder=None):
     """
-    Driver function for fast APSP algorithm on simple graph with multiple disconnected components.
-    Does a rolling sum instead of maintaining an nxn distance matrix
+    Driver function for fast APSP algorithm on an edge array with multiple disconnected components.
+    Sums the distance histogram instead of building a distribution dictionary
 
-    :param G: nx.Graph
+    :param num_nodes: Number of nodes
+    :param edges: m x 2 ndarray of node ids in 0..n-1, e.g. from igraph.Graph.get_edgelist()
+    :param num_threads: Number of threads to split BFS sources across within each component.
+                        If None, uses every thread available to numba
+    :param layout: Adjacency layout for the BFS kernels. 'csr' (default) or the padded 'semisparse' matrix
+    :param engine: 'bfs', 'hybrid' or 'bitparallel'
+    :param collapse_twins: Run one BFS per class of structural twins instead of one per node
+    :param checkpoint: Optional path of a checkpoint file, see all_pairs_shortest_paths
+    :param reorder: Optional node relabeling, 'bfs', 'rcm' or 'degree', see all_pairs_shortest_paths
     :return: Tuple, (num distances, sum distances)
     """
-    if len(G) <= 1:
+    if num_nodes <= 1:
         return 1, 0
-    if nx.is_connected(G):
-        return len(G)**2, _all_pairs_shortest_paths_preprocessor(G, rolling_sum=True)
-    else:
-        num_distances = 0
-        sum_distances = 0
-        gen = (G.subgraph(c) for c in nx.connected_components(G))
-        for g in gen:
-            if len(g) == 1:
-                # Add single node to denomenator
-                num_distances += 1
-                continue
-            res = _all_pairs_shortest_paths_preprocessor(g, rolling_sum=True)
-            # Increase num distances by size of comp squared
-            num_distances += len(g) ** 2
-            sum_distances += res
-        return num_distances, sum_distances
+    component_sizes, histograms = _component_histograms(num_nodes, edges, num_threads=num_threads, layout=layout,
+                                                        engine=engine, collapse_twins=collapse_twins,
+                                                        checkpoint=checkpoint, reorder=reorder)
+    # Each component contributes its size squared (ordered pairs, including self pairs)
+    num_distances = int(np.sum(component_sizes.astype(np.int64) ** 2))
+    sum_distances = sum(_sum_of_histogram(histogram) for histogram in histograms)
+    return num_distances, sum_distances
+
+
+# Components up to this size are batched into a single kernel call instead of being preprocessed one by one
+SMALL_COMPONENT_SIZE = 256
+
+
+def _component_histograms(num_nodes, edges, num_threads=1, layout='csr', engine='bfs', collapse_twins=False,
+                          checkpoint=None, reorder=None):
+    """
+    Distance histograms of every connected component.
+    The largest component, and any other above SMALL_COMPONENT_SIZE, goes through the preprocessor on its own,
+    largest first. All remaining components, singletons included, share a single batched kernel call,
+    which uses top-down (or hybrid) BFS and skips twin collapsing.
+
+    :param num_nodes: Number of nodes
+    :param edges: m x 2 ndarray of node ids in 0..n-1
+    :param num_threads: Number of threads to split BFS sources across. If None, uses every thread available to numba
+    :param layout: Adjacency layout for the large components, 'csr' or 'semisparse'
+    :param engine: 'bfs', 'hybrid' or 'bitparallel'
+    :param collapse_twins: Run one BFS per class of structural twins in the large components
+    :param checkpoint: Optional path of a checkpoint file covering the large components
+    :param reorder: Optional node relabeling, 'bfs', 'rcm' or 'degree'
+    :return: ndarray of component sizes, list of 1d int64 histograms indexed by distance
+    """
+    if reorder is not None:
+        # Component ranges keep the relative order of nodes, so the relabeling carries into every component
+        edges = reorder_edges(num_nodes, edges, reorder)
+    indptr, indices, bounds = _component_ranges(num_nodes, edges)
+    component_sizes = np.diff(bounds)
+    num_large = max(1, int(np.count_nonzero(component_sizes > SMALL_COMPONENT_SIZE)))
+    if checkpoint is not None:
+        # Twin collapsing changes which sources are run, so progress only carries over between equal settings
+        checkpoint = _Checkpoint(checkpoint, _fingerprint(num_nodes, edges, collapse_twins))
+
+    histograms = []
+    for c in range(num_large):
+        lo, hi = bounds[c], bounds[c + 1]
+        if checkpoint is not None and c < len(checkpoint.histograms):
+            histograms.append(checkpoint.histograms[c])
+            continue
+        if hi - lo == 1:
+            histogram = np.ones(1, dtype=np.int64)
+        else:
+            # Rebase the component's rows so it is a standalone CSR adjacency
+            component_indptr = indptr[lo:hi + 1] - indptr[lo]
+            component_indices = indices[indptr[lo]:indptr[hi]]
+            histogram = _all_pairs_shortest_paths_preprocessor(component_indptr, component_indices,
+                                                               rolling_sum=False, num_threads=num_threads,
+                                                               layout=layout, engine=engine,
+                                                               collapse_twins=collapse_twins, checkpoint=checkpoint)
+        if checkpoint is not None:
+            checkpoint.finish(histogram)
+        histograms.append(histogram)
+
+    if num_large < len(component_sizes):
+        small_bounds = bounds[num_large:]
+        max_size = int(component_sizes[num_large])
+        num_workers = _num_workers(num_threads, len(small_bounds) - 1)
+        trackers = np.full((num_workers, max_size), -1, dtype=indices.dtype)
+        stamps = np.zeros((num_workers, max_size), dtype=np.int32)
+        # A component's diameter is less than its size
+        dists = np.zeros((num_workers, max_size), dtype=_distance_dtype(max_size))
+        with _numba_threads(num_workers):
+            histograms.append(_small_components_driver(indptr, indices, small_bounds, trackers, stamps, dists,
+                                                       max_size, engine == 'hybrid'))
+    return component_sizes, histograms
+
+
+def _component_ranges(num_nodes, edges):
+    """
+    Relabels nodes so every connected component is a contiguous range of ids, largest component first.
+    Neighbor ids are stored relative to the start of their component, so the rows of component c,
+    indptr[bounds[c]:bounds[c+1]+1] over indices, are a CSR adjacency of that component alone.
 
+    :param num_nodes: Number of nodes
+    :param edges: m x 2 ndarray of node ids in 0..n-1
+    :return: indptr ndarray, indices ndarray, bounds ndarray of component start ids (size num_components + 1)
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    _, labels, sizes = np.unique(_component_labels(num_nodes, edges), return_inverse=True, return_counts=True)
+    # Rank components by descending size, ties broken by smallest node id
+    component_order = np.argsort(-sizes, kind='stable')
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[component_order] = np.arange(len(sizes))
+    node_order = np.argsort(rank[labels.ravel()], kind='stable')
+    new_ids = np.empty(num_nodes, dtype=np.int64)
+    new_ids[node_order] = np.arange(num_nodes)
+
+    sizes = sizes[component_order]
+    bounds = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=bounds[1:])
 
-def _all_pairs_shortest_paths_preprocessor(G, rolling_sum=True):
+    indptr, indices = csr_from_edges(num_nodes, new_ids[edges])
+    row_starts = np.repeat(bounds[:-1], sizes)
+    indices = (indices - np.repeat(row_starts, np.diff(indptr))).astype(indices.dtype, copy=False)
+    return indptr, indices, bounds
+
+
+def _all_pairs_shortest_paths_preprocessor(indptr, indices, rolling_sum=True, num_threads=1, layout='csr',
+                                           engine='bfs', collapse_twins=False, checkpoint=None):
     """
     Helper function for APSP on single connected component
 
-    :param G: nx.Graph
-    :return: 1d ndarray of size n^2 where n is the number of nodes in the connected component
+    :param indptr: CSR row offsets of the component
+    :param indices: CSR neighbor ids of the component
+    :param num_threads: Number of threads to split BFS sources across. If None, uses every thread available to numba
+    :param layout: Adjacency layout handed to the BFS kernels, 'csr' or 'semisparse'
+    :param engine: 'bfs', 'hybrid' or 'bitparallel'
+    :param collapse_twins: Run one BFS per class of structural twins instead of one per node
+    :param checkpoint: Optional _Checkpoint. Sources are then run in blocks of CHECKPOINT_EVERY,
+                       saving the partial histogram after each block
+    :return: int sum of distances if rolling_sum, else 1d int ndarray histogram indexed by distance
     """
-    num_nodes = len(G)
-    node_list = list(range(len(G)))
-    max_degree = max(G.degree, key=lambda x: x[1])[1]
+    if engine not in ('bfs', 'hybrid', 'bitparallel'):
+        raise ValueError('Unknown APSP engine: ' + str(engine))
+    num_nodes = len(indptr) - 1
+    indptr, indices = _to_adjacency(indptr, indices, num_nodes, layout)
+    if collapse_twins:
+        node_list, weights = _twin_classes(indptr, indices, num_nodes)
+    else:
+        node_list = np.arange(num_nodes, dtype=np.int64)
+        weights = np.ones(num_nodes, dtype=np.int64)
+
+    num_workers = _num_workers(num_threads, len(node_list))
+    # One set of scratch buffers per worker so that concurrent BFSs don't share them
+    trackers = np.full((num_workers, num_nodes), -1, dtype=indices.dtype)
+    stamps = np.zeros((num_workers, num_nodes), dtype=np.int32)
+
+    # Eccentricity of any node bounds the diameter by twice itself, which bounds the histogram length
+    eccentricity = _bfs_histogram(indptr, indices, node_list[0], num_nodes, trackers[0], stamps[0], 1,
+                                  np.zeros(num_nodes, dtype=np.int64), 1)
+    num_bins = min(2 * eccentricity, num_nodes - 1) + 1
+    dists = np.zeros((num_workers, num_nodes), dtype=_distance_dtype(num_bins))
 
-    tracker = np.full(num_nodes, -1, dtype=np.int64)
-    G_numpy = _to_semisparse_matrix(G, num_nodes, max_degree)
+    if engine == 'bitparallel':
+        # Seen, frontier and next-frontier masks for each worker
+        masks = np.zeros((num_workers, 3, num_nodes), dtype=np.uint64)
+
+    def run(start, stop):
+        if engine == 'bitparallel':
+            return _all_pairs_shortest_paths_bitparallel_driver(indptr, indices, num_nodes, node_list[start:stop],
+                                                                weights[start:stop], masks, num_bins)
+        else:
+            return _all_pairs_shortest_paths_driver(indptr, indices, num_nodes, node_list[start:stop],
+                                                    weights[start:stop], trackers, stamps, dists, num_bins,
+                                                    engine == 'hybrid')
+
+    with _numba_threads(num_workers):
+        if checkpoint is None:
+            histogram = run(0, len(node_list))
+        else:
+            done, histogram = checkpoint.resume(num_bins)
+            for start in range(done, len(node_list), CHECKPOINT_EVERY):
+                stop = min(start + CHECKPOINT_EVERY, len(node_list))
+                histogram += run(start, stop)
+                checkpoint.save(stop, histogram)
     if rolling_sum:
-        return _all_pairs_shortest_paths_rolling_sum_driver(G_numpy, num_nodes, node_list, max_degree, tracker)
+        return _sum_of_histogram(histogram)
     else:
-        return _all_pairs_shortest_paths_driver(G_numpy, num_nodes, node_list, max_degree, tracker)
+        return histogram
+
+
+# Number of sources run between checkpoint saves. A multiple of 64 keeps bit-parallel batches full
+CHECKPOINT_EVERY = 4096
+
+
+class _Checkpoint:
+    def __init__(self, path, fingerprint):
+        """
+        Progress of an exact APSP run, persisted with np.savez.
+        Holds the histograms of finished components, and the number of sources done and
+        partial histogram of the component in progress.
+        A file written for a different graph is ignored and overwritten.
+
+        :param path: Checkpoint file path
+        :param fingerprint: 1d int64 ndarray identifying the graph and settings
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.histograms = []
+        self.done = 0
+        self.partial = np.zeros(0, dtype=np.int64)
+        if os.path.exists(path):
+            with np.load(path) as f:
+                if np.array_equal(f['fingerprint'], fingerprint):
+                    offsets = np.cumsum(f['finished_lengths'])
+                    self.histograms = [f['finished'][end - length:end]
+                                       for end, length in zip(offsets, f['finished_lengths'])]
+                    self.done = int(f['done'])
+                    self.partial = f['partial']
+
+    def resume(self, num_bins):
+        """
+        Starting point for the component in progress
+
+        :param num_bins: Histogram length of the component
+        :return: Tuple, (number of sources already done, partial histogram)
+        """
+        if self.done > 0 and len(self.partial) == num_bins:
+            return self.done, self.partial.copy()
+        return 0, np.zeros(num_bins, dtype=np.int64)
 
+    def save(self, done, partial):
+        """
+        Records progress within the component in progress
 
-def _to_semisparse_matrix(G, num_nodes, max_degree):
+        :param done: Number of sources done
+        :param partial: Partial histogram over those sources
+        """
+        self.done = done
+        self.partial = partial
+        self._write()
+
+    def finish(self, histogram):
+        """
+        Records a finished component, and starts the next one from scratch
+
+        :param histogram: Histogram of the finished component
+        """
+        self.histograms.append(histogram)
+        self.done = 0
+        self.partial = np.zeros(0, dtype=np.int64)
+        self._write()
+
+    def _write(self):
+        lengths = np.array([len(h) for h in self.histograms], dtype=np.int64)
+        finished = np.concatenate(self.histograms) if self.histograms else np.zeros(0, dtype=np.int64)
+        # Write then rename, so a preemption mid-write leaves the previous checkpoint intact
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, fingerprint=self.fingerprint, finished=finished, finished_lengths=lengths,
+                     done=self.done, partial=self.partial)
+        os.replace(tmp_path, self.path)
+
+
+def _fingerprint(num_nodes, edges, collapse_twins):
+    """
+    Identifies a graph, and the settings that determine the order sources are run in
+
+    :param num_nodes: Number of nodes
+    :param edges: m x 2 ndarray of node ids
+    :param collapse_twins: Whether twins are collapsed
+    :return: 1d int64 ndarray
+    """
+    edges = np.ascontiguousarray(edges, dtype=np.int64)
+    return np.array([num_nodes, len(edges), zlib.crc32(edges.tobytes()), int(collapse_twins)], dtype=np.int64)
+
+
+def _twin_classes(indptr, indices, num_nodes):
+    """
+    Groups structural twins by hashing neighbor sets.
+    False twins share open neighborhoods N(u) = N(v), true twins share closed neighborhoods N[u] = N[v].
+    Twins see the same multiset of distances, so one BFS per class, weighted by class size, is exact.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param num_nodes: Number of nodes in component
+    :return: ndarray of class representatives sorted by descending class size, ndarray of class sizes
+    """
+    rows = []
+    open_classes = defaultdict(list)
+    for v in range(num_nodes):
+        row = indices[indptr[v]:indptr[v + 1]]
+        # Drop semisparse padding
+        row = np.sort(row[row != -1])
+        rows.append(row)
+        open_classes[row.tobytes()].append(v)
+
+    closed_classes = defaultdict(list)
+    representatives = []
+    weights = []
+    for members in open_classes.values():
+        if len(members) > 1:
+            representatives.append(members[0])
+            weights.append(len(members))
+        else:
+            v = members[0]
+            closed_classes[np.sort(np.append(rows[v], v)).tobytes()].append(v)
+    for members in closed_classes.values():
+        representatives.append(members[0])
+        weights.append(len(members))
+
+    representatives = np.array(representatives, dtype=np.int64)
+    weights = np.array(weights, dtype=np.int64)
+    # Keeps equal weights next to each other, which the bit-parallel engine exploits
+    order = np.argsort(-weights, kind='stable')
+    return representatives[order], weights[order]
+
+
+def _add_histogram(results, histogram):
+    """
+    Adds a distance histogram to a distribution dictionary in place
+
+    :param results: Distribution dictionary with distances as keys
+    :param histogram: 1d ndarray indexed by distance
+    """
+    for d in np.flatnonzero(histogram):
+        results[float(d)] += int(histogram[d])
+
+
+def _sum_of_histogram(histogram):
+    """
+    Sum of distances described by a histogram
+
+    :param histogram: 1d ndarray indexed by distance
+    :return: int
+    """
+    return int(np.dot(np.arange(len(histogram), dtype=np.int64), histogram))
+
+
+def _num_workers(num_threads, num_sources):
+    """
+    Number of partitions to split BFS sources into.
+    Partitions are fixed by the request rather than by the threads numba actually has,
+    so results are reduced the same way regardless of the machine.
+
+    :param num_threads: Requested number of threads. If None, uses every thread available to numba
+    :param num_sources: Number of BFS sources
+    :return: int
+    """
+    if num_threads is None:
+        num_threads = nb.config.NUMBA_NUM_THREADS
+    return max(1, min(int(num_threads), num_sources))
+
+
+@contextmanager
+def _numba_threads(num_workers):
+    """
+    Caps numba's thread count at num_workers inside the block.
+    The thread count is process-wide, so the previous value is restored on exit, even if the block raises.
+
+    :param num_workers: Number of workers the parallel driver splits work into
+    """
+    previous_threads = nb.get_num_threads()
+    nb.set_num_threads(min(num_workers, nb.config.NUMBA_NUM_THREADS))
+    try:
+        yield
+    finally:
+        nb.set_num_threads(previous_threads)
+
+
+def _to_adjacency(indptr, indices, num_nodes, layout):
+    """
+    Builds the (indptr, indices) pair consumed by the BFS kernels.
+    Neighbors of node i are indices[indptr[i]:indptr[i+1]], ending early at the first -1.
+
+    :param indptr: CSR row offsets
+    :param indices: CSR neighbor ids
+    :param num_nodes: Number of nodes
+    :param layout: 'csr' for compressed sparse rows, 'semisparse' for the padded n x max_degree matrix
+    :return: indptr ndarray, indices ndarray
+    """
+    if layout == 'csr':
+        return indptr, indices
+    elif layout == 'semisparse':
+        max_degree = int(np.max(np.diff(indptr)))
+        G_numpy = _to_semisparse_matrix(indptr, indices, num_nodes, max_degree)
+        # Every row has the same stride, padding is skipped by the kernels' -1 check
+        indptr = np.arange(0, (num_nodes + 1) * max_degree, max_degree, dtype=np.int64)
+        return indptr, G_numpy.ravel()
+    else:
+        raise ValueError('Unknown adjacency layout: ' + str(layout))
+
+
+def csr_from_edges(num_nodes, edges):
+    """
+    Creates compressed sparse row adjacency straight from an undirected edge array.
+    Memory is O(n + m) regardless of the degree distribution. Uses int32 for node ids and offsets when they fit.
+    Self-loops are dropped.
+
+    :param num_nodes: Number of nodes
+    :param edges: m x 2 ndarray of node ids in 0..n-1, each edge listed once
+    :return: indptr ndarray of size n+1, indices ndarray of size 2m
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    heads = np.concatenate((edges[:, 0], edges[:, 1]))
+    tails = np.concatenate((edges[:, 1], edges[:, 0]))
+    order = np.argsort(heads, kind='stable')
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(heads, minlength=num_nodes), out=indptr[1:])
+    indices = tails[order]
+    return indptr.astype(_index_dtype(len(indices)), copy=False), indices.astype(_index_dtype(num_nodes), copy=False)
+
+
+def _distance_dtype(num_bins):
+    """
+    Smallest unsigned dtype holding every distance below num_bins
+
+    :param num_bins: Histogram length, exceeds the diameter
+    :return: numpy dtype
+    """
+    if num_bins <= np.iinfo(np.uint8).max + 1:
+        return np.uint8
+    elif num_bins <= np.iinfo(np.uint16).max + 1:
+        return np.uint16
+    return np.uint32
+
+
+def _index_dtype(max_value):
+    """
+    Smallest signed integer type used for node ids and edge offsets.
+    Signed so that -1 can still mark padding.
+
+    :param max_value: Largest value to be stored
+    :return: numpy dtype
+    """
+    if max_value < np.iinfo(np.int32).max:
+        return np.int32
+    return np.int64
+
+
+def _to_semisparse_matrix(indptr, indices, num_nodes, max_degree):
     """
     Creates "semisparse" matrix as a compromise between adjacency matrix and adjacency list.
     Matrix is n x max_degree, where elements represent the node ids.
+    Kept for benchmarking against CSR; memory is O(n * max_degree).
 
-    :param G: Connected nx.Graph
+    :param indptr: CSR row offsets
+    :param indices: CSR neighbor ids
     :param num_nodes: Number of nodes
     :param max_degree: Largest degree in connected component
     :return: n x max_degree ndarray
     """
-    if num_nodes == 1:
-        return np.array([0])
+    degrees = np.diff(indptr)
+    rows = np.repeat(np.arange(num_nodes), degrees)
+    columns = np.arange(len(indices)) - np.repeat(indptr[:-1], degrees)
+    G_numpy = np.full((num_nodes, max_degree), -1, dtype=np.int64)
+    G_numpy[rows, columns] = indices
+    return G_numpy
 
-    G = nx.to_scipy_sparse_matrix(G, nodelist=None, dtype=None, weight=None, format='lil')
 
-    def generate_rows(rows):
-        for row in rows:
-            yield np.pad(row, (0, max_degree - len(row)), 'constant', constant_values=-1)
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _all_pairs_shortest_paths_driver(indptr, indices, num_nodes, node_list, weights, trackers, stamps, dists,
+                                     num_bins, hybrid):
+    """
+    Jitted driver function for single-component APSP, returning a histogram of distances.
+    Sources are dealt round-robin to one worker per row of trackers.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param num_nodes: Number of nodes in component
+    :param node_list: Array of source nodes
+    :param weights: Number of nodes each source stands in for
+    :param trackers: num_workers x n tracker ndarray, one row per worker
+    :param stamps: num_workers x n int32 visit stamps, one row per worker. Cleared on entry
+    :param dists: num_workers x n distance ndarray of a dtype holding num_bins - 1, used by hybrid BFS
+    :param num_bins: Histogram length, must exceed the diameter
+    :param hybrid: Use direction-optimizing BFS instead of top-down BFS
+    :return: 1d int64 ndarray, number of (ordered) pairs at each distance
+    """
+    num_workers = trackers.shape[0]
+    # Integer counts are exact, so the reduction doesn't depend on scheduling
+    histograms = np.zeros((num_workers, num_bins), dtype=np.int64)
+    for w in nb.prange(num_workers):
+        tracker = trackers[w]
+        stamp = stamps[w]
+        stamp[:] = 0
+        histogram = histograms[w]
+        epoch = 0
+        for k in range(w, len(node_list), num_workers):
+            # A fresh epoch marks every node unvisited without touching the buffer
+            epoch += 1
+            if hybrid:
+                _hybrid_bfs_histogram(indptr, indices, node_list[k], num_nodes, tracker, stamp, epoch, dists[w],
+                                      histogram, weights[k])
+            else:
+                _bfs_histogram(indptr, indices, node_list[k], num_nodes, tracker, stamp, epoch, histogram,
+                               weights[k])
 
-    return np.array(np.stack(list(generate_rows(G.rows))), dtype=np.int64)
+    results = np.zeros(num_bins, dtype=np.int64)
+    for w in range(num_workers):
+        results += histograms[w]
+    return results
 
 
-@jit(nopython=True, nogil=True)
-def _all_pairs_shortest_paths_driver(G, num_nodes, node_list, max_degree, tracker):
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _small_components_driver(indptr, indices, bounds, trackers, stamps, dists, num_bins, hybrid):
     """
-    Jitted driver function for single-component APSP
+    Jitted driver function for APSP over many small components in one call, returning a histogram of distances.
+    Component c is the node range bounds[c]:bounds[c+1] with neighbor ids relative to bounds[c].
+    Components are dealt round-robin to one worker per row of trackers.
 
-    :param G: Semisparse matrix
-    :param num_nodes: Number of nodes in component
-    :param node_list: List of nodes
-    :param max_degree: Max degree of nodes
-    :param tracker: Tracker ndarray to maintain neighbor
-    :return: 1d ndarray of size n^2
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids, relative to the start of their component
+    :param bounds: Start id of each component, plus the end of the last one
+    :param trackers: num_workers x (largest component size) tracker ndarray, one row per worker
+    :param stamps: Visit stamps shaped like trackers. Cleared on entry
+    :param dists: Distance buffers shaped like trackers, of a dtype holding num_bins - 1, used by hybrid BFS
+    :param num_bins: Histogram length, must exceed every component's diameter
+    :param hybrid: Use direction-optimizing BFS instead of top-down BFS
+    :return: 1d int64 ndarray, number of (ordered) pairs at each distance
     """
-    results = np.zeros(num_nodes**2)
-    for i in node_list:
-        start = i * num_nodes
-        results[start:start+num_nodes] = _bfs_distances(G, i, num_nodes, max_degree, tracker)
+    num_workers = trackers.shape[0]
+    num_components = len(bounds) - 1
+    histograms = np.zeros((num_workers, num_bins), dtype=np.int64)
+    for w in nb.prange(num_workers):
+        tracker = trackers[w]
+        stamp = stamps[w]
+        stamp[:] = 0
+        histogram = histograms[w]
+        epoch = 0
+        for c in range(w, num_components, num_workers):
+            lo = bounds[c]
+            size = bounds[c + 1] - lo
+            if size == 1:
+                histogram[0] += 1
+                continue
+            component_indptr = indptr[lo:lo + size + 1]
+            for source in range(size):
+                epoch += 1
+                if hybrid:
+                    _hybrid_bfs_histogram(component_indptr, indices, source, size, tracker, stamp, epoch, dists[w],
+                                          histogram, 1)
+                else:
+                    _bfs_histogram(component_indptr, indices, source, size, tracker, stamp, epoch, histogram, 1)
+
+    results = np.zeros(num_bins, dtype=np.int64)
+    for w in range(num_workers):
+        results += histograms[w]
     return results
 
 
-@jit(nopython=True, nogil=True)
-def _all_pairs_shortest_paths_rolling_sum_driver(G, num_nodes, node_list, max_degree, tracker):
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _all_pairs_shortest_paths_bitparallel_driver(indptr, indices, num_nodes, node_list, weights, masks, num_bins):
     """
-    Jitted driver function for single-component APSP, returning sum of distances
+    Jitted driver function for single-component APSP using bit-parallel BFS, returning a histogram of distances.
+    Sources are grouped into batches of 64, and batches are dealt round-robin to one worker per row of masks.
 
-    :param G: Semisparse matrix
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
     :param num_nodes: Number of nodes in component
-    :param node_list: List of nodes
-    :param max_degree: Max degree of nodes
-    :param tracker: Tracker ndarray to maintain neighbor
-    :return: float
+    :param node_list: Array of source nodes
+    :param weights: Number of nodes each source stands in for
+    :param masks: num_workers x 3 x n uint64 ndarray, one set of bitmasks per worker
+    :param num_bins: Histogram length, must exceed the diameter
+    :return: 1d int64 ndarray, number of (ordered) pairs at each distance
     """
-    sum_distances = 0.0
-    for i in node_list:
-        sum_distances += np.sum(_bfs_distances(G, i, num_nodes, max_degree, tracker))
-    return sum_distances
+    num_workers = masks.shape[0]
+    num_batches = (len(node_list) + 63) // 64
+    histograms = np.zeros((num_workers, num_bins), dtype=np.int64)
+    for w in nb.prange(num_workers):
+        histogram = histograms[w]
+        for b in range(w, num_batches, num_workers):
+            sources = node_list[b * 64:(b + 1) * 64]
+            _bitparallel_bfs_histogram(indptr, indices, sources, weights[b * 64:(b + 1) * 64], num_nodes, masks[w],
+                                       histogram)
+
+    results = np.zeros(num_bins, dtype=np.int64)
+    for w in range(num_workers):
+        results += histograms[w]
+    return results
 
 
-@jit(nopython=True, nogil=True)
-def _bfs_distances(G, starting_node, num_nodes, max_degree, tracker):
+@jit(nopython=True, nogil=True, cache=True)
+def _bfs_distances(indptr, indices, starting_node, num_nodes, tracker):
     """
-    Jitted BFS using semisparse matrices
+    Jitted BFS over (indptr, indices) adjacency
 
-    :param G: Semisparse matrix
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
     :param starting_node: Source node
     :param num_nodes: Number of nodes in component
-    :param max_degree: Max degree of nodes
     :param tracker: Tracker ndarray to maintain neighbor
     :return: 1d distance ndarrray of size n
     """
@@ -168,10 +708,10 @@ def _bfs_distances(G, starting_node, num_nodes, max_degree, tracker):
         node = tracker[pos]
         pos += 1
         # iterating over neighbors of node
-        i = 0
-        # Don't go past end of row
-        while i < max_degree and G[node, i] != -1:
-            val = G[node, i]
+        i = indptr[node]
+        # Don't go past end of row, or into semisparse padding
+        while i < indptr[node + 1] and indices[i] != -1:
+            val = indices[i]
             if visited[val] == 0:
                 visited[val] = 1
                 num_visited += 1
@@ -180,3 +720,280 @@ def _bfs_distances(G, starting_node, num_nodes, max_degree, tracker):
                 end += 1
             i += 1
     return dist
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _bfs_histogram(indptr, indices, starting_node, num_nodes, tracker, stamp, epoch, histogram, weight):
+    """
+    Jitted allocation-free BFS, adding weight to histogram[d] for every node at distance d.
+    The tracker holds each level contiguously, so levels are counted from positions instead of storing distances.
+    A node is visited iff its stamp equals epoch, so the buffers never need clearing between sources.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param starting_node: Source node
+    :param num_nodes: Number of nodes in component
+    :param tracker: Tracker ndarray, holds nodes in the order they're visited
+    :param stamp: Visit stamp ndarray, no entry may equal epoch on entry
+    :param epoch: Stamp of this BFS
+    :param histogram: 1d int64 ndarray indexed by distance, modified in place
+    :param weight: Number of nodes the source stands in for
+    :return: Eccentricity of the source
+    """
+    tracker[0] = starting_node
+    stamp[starting_node] = epoch
+    histogram[0] += weight
+    pos = 0
+    end = 1
+    level = 0
+    while pos < end and end < num_nodes:
+        # Nodes at the current level are tracker[pos:level_end]
+        level_end = end
+        while pos < level_end:
+            node = tracker[pos]
+            pos += 1
+            i = indptr[node]
+            # Don't go past end of row, or into semisparse padding
+            while i < indptr[node + 1] and indices[i] != -1:
+                val = indices[i]
+                if stamp[val] != epoch:
+                    stamp[val] = epoch
+                    tracker[end] = val
+                    end += 1
+                i += 1
+        if end == level_end:
+            break
+        level += 1
+        histogram[level] += weight * (end - level_end)
+    return level
+
+
+# Beamer et al. switching parameters: go bottom-up once the frontier's edges exceed
+# 1/ALPHA of the unexplored edges, return top-down once the frontier holds fewer than n/BETA nodes
+HYBRID_ALPHA = 14
+HYBRID_BETA = 24
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _hybrid_bfs_histogram(indptr, indices, starting_node, num_nodes, tracker, stamp, epoch, dist, histogram,
+                          weight):
+    """
+    Jitted allocation-free direction-optimizing BFS, adding weight to histogram[d] for every node at distance d.
+    Levels are expanded top-down (frontier pushes to neighbors) or bottom-up
+    (unvisited nodes look for a parent in the frontier), whichever touches fewer edges.
+    Visits are epoch stamped as in _bfs_histogram,
+    and dist is only read for stamped nodes, where bottom-up steps use it to recognise the frontier.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param starting_node: Source node
+    :param num_nodes: Number of nodes in component
+    :param tracker: Tracker ndarray, holds nodes in the order they're visited
+    :param stamp: Visit stamp ndarray, no entry may equal epoch on entry
+    :param epoch: Stamp of this BFS
+    :param dist: Distance ndarray, any unsigned dtype holding the eccentricity
+    :param histogram: 1d int64 ndarray indexed by distance, modified in place
+    :param weight: Number of nodes the source stands in for
+    :return: Eccentricity of the source
+    """
+    tracker[0] = starting_node
+    stamp[starting_node] = epoch
+    dist[starting_node] = 0
+    histogram[0] += weight
+    num_visited = 1
+
+    frontier_start = 0
+    frontier_end = 1
+    unexplored_edges = indptr[num_nodes] - indptr[0] - (indptr[starting_node + 1] - indptr[starting_node])
+    frontier_edges = indptr[starting_node + 1] - indptr[starting_node]
+    bottom_up = False
+    level = 0
+
+    while frontier_end > frontier_start and num_visited < num_nodes:
+        frontier_size = frontier_end - frontier_start
+        if not bottom_up and frontier_edges > unexplored_edges / HYBRID_ALPHA:
+            bottom_up = True
+        elif bottom_up and frontier_size < num_nodes / HYBRID_BETA:
+            bottom_up = False
+
+        end = frontier_end
+        frontier_edges = 0
+        if bottom_up:
+            for node in range(num_nodes):
+                if stamp[node] == epoch:
+                    continue
+                i = indptr[node]
+                while i < indptr[node + 1] and indices[i] != -1:
+                    val = indices[i]
+                    # Nodes found during this step are at level + 1 and can't be parents
+                    if stamp[val] == epoch and dist[val] == level:
+                        stamp[node] = epoch
+                        dist[node] = level + 1
+                        tracker[end] = node
+                        end += 1
+                        break
+                    i += 1
+        else:
+            for pos in range(frontier_start, frontier_end):
+                node = tracker[pos]
+                i = indptr[node]
+                while i < indptr[node + 1] and indices[i] != -1:
+                    val = indices[i]
+                    if stamp[val] != epoch:
+                        stamp[val] = epoch
+                        dist[val] = level + 1
+                        tracker[end] = val
+                        end += 1
+                    i += 1
+
+        if end == frontier_end:
+            break
+        for pos in range(frontier_end, end):
+            node = tracker[pos]
+            degree = indptr[node + 1] - indptr[node]
+            frontier_edges += degree
+            unexplored_edges -= degree
+        num_visited += end - frontier_end
+        frontier_start = frontier_end
+        frontier_end = end
+        level += 1
+        histogram[level] += weight * (end - frontier_start)
+    return level
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _bitparallel_bfs_histogram(indptr, indices, sources, weights, num_nodes, masks, histogram):
+    """
+    Jitted bit-parallel BFS from up to 64 sources at once.
+    Bit i of a node's mask belongs to sources[i], so every level scans each edge once for the whole batch.
+    Adds the distance counts of all sources to histogram in place.
+
+    :param indptr: Row offsets into indices
+    :param indices: Neighbor ids
+    :param sources: Up to 64 source nodes
+    :param weights: Number of nodes each source stands in for
+    :param num_nodes: Number of nodes in component
+    :param masks: 3 x n uint64 ndarray for seen, frontier and next-frontier bits
+    :param histogram: 1d int64 ndarray indexed by distance
+    """
+    seen = masks[0]
+    frontier = masks[1]
+    next_frontier = masks[2]
+    seen[:] = 0
+    frontier[:] = 0
+
+    one = np.uint64(1)
+    for i in range(len(sources)):
+        bit = one << np.uint64(i)
+        seen[sources[i]] |= bit
+        frontier[sources[i]] |= bit
+    # Every source is at distance 0 from itself
+    histogram[0] += np.sum(weights)
+    # With a single weight per batch, counts are popcounts times that weight
+    uniform_weight = weights[0]
+    for i in range(len(weights)):
+        if weights[i] != uniform_weight:
+            uniform_weight = 0
+    if len(sources) == 64:
+        all_bits = ~np.uint64(0)
+    else:
+        all_bits = (one << np.uint64(len(sources))) - one
+
+    level = 0
+    found = len(sources)
+    while found > 0:
+        level += 1
+        found = 0
+        for node in range(num_nodes):
+            # Pull frontier bits from neighbors, skipping nodes every source has already reached
+            if seen[node] == all_bits:
+                next_frontier[node] = 0
+                continue
+            bits = np.uint64(0)
+            i = indptr[node]
+            while i < indptr[node + 1] and indices[i] != -1:
+                bits |= frontier[indices[i]]
+                i += 1
+            bits &= ~seen[node]
+            next_frontier[node] = bits
+            if bits != 0:
+                if uniform_weight != 0:
+                    found += uniform_weight * _popcount(bits)
+                else:
+                    found += _weighted_popcount(bits, weights)
+        if found == 0:
+            break
+        for node in range(num_nodes):
+            seen[node] |= next_frontier[node]
+            frontier[node] = next_frontier[node]
+        histogram[level] += found
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _component_labels(num_nodes, edges):
+    """
+    Jitted union-find over an edge array
+
+    :param num_nodes: Number of nodes
+    :param edges: m x 2 ndarray of node ids in 0..n-1
+    :return: 1d ndarray, smallest node id of each node's component
+    """
+    parent = np.arange(num_nodes)
+    for e in range(edges.shape[0]):
+        u = _find_root(parent, edges[e, 0])
+        v = _find_root(parent, edges[e, 1])
+        # Smaller id becomes the root, so parent[v] <= v always holds
+        if u < v:
+            parent[v] = u
+        elif v < u:
+            parent[u] = v
+    # Parents precede their children, so one forward pass flattens every tree
+    for v in range(num_nodes):
+        parent[v] = parent[parent[v]]
+    return parent
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _find_root(parent, v):
+    """
+    Jitted union-find root lookup with path halving
+
+    :param parent: Parent ndarray, modified in place
+    :param v: Node id
+    :return: Root of v's tree
+    """
+    while parent[v] != v:
+        parent[v] = parent[parent[v]]
+        v = parent[v]
+    return v
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _popcount(x):
+    """
+    Number of set bits in a uint64
+
+    :param x: np.uint64
+    :return: int
+    """
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return int((x * np.uint64(0x0101010101010101)) >> np.uint64(56))
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _weighted_popcount(x, weights):
+    """
+    Sum of weights[i] over the set bits i of a uint64
+
+    :param x: np.uint64
+    :param weights: Weight per bit
+    :return: int
+    """
+    total = 0
+    while x != 0:
+        lowest = x & (~x + np.uint64(1))
+        total += weights[_popcount(lowest - np.uint64(1))]
+        x ^= lowest
+    return total
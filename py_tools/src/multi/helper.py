@@ -5,7 +5,7 @@ import numpy as np
 
 # Function must return a list
 # Each function will get a single arg from the list of arguments
-def multiprocessing_to_csv(fctn, args, filename, num_processes=None):
+def multiprocessing_to_csv(fctn, args, filename, num_processes=None, warmup=None, seed=None):
     """
     Helper function to parallelize the execution of a function over a set of arguments.
 
@@ -13,17 +13,41 @@ def multiprocessing_to_csv(fctn, args, filename, num_processes=None):
     :param args: List of arguments. Multiple arguments must be passed as tuple.
     :param filename: Output file
     :param num_processes: Number of processes. Defaults to available number.
+    :param warmup: Optional function each subprocess calls once on startup, e.g. semisparse.warmup
+    :param seed: Optional seed for reproducible runs. Task i then reseeds the global np.random state
+                 from the i-th child of np.random.SeedSequence(seed), so its random numbers depend neither
+                 on the number of processes nor on which process runs it
     """
     # Function to call on initialization of subprocess. Make sure to np.random.seed()!
     # If you don't seed, "random" numbers across processes will be the same
     def initializer():
         np.random.seed()
+        if warmup is not None:
+            warmup()
 
     if not num_processes:
         pool = mp.Pool(initializer=initializer)
     else:
         pool = mp.Pool(num_processes, initializer=initializer)
+    if seed is not None:
+        args = list(zip(np.random.SeedSequence(seed).spawn(len(args)), args))
+        fctn = _SeededTask(fctn)
     with open(filename, 'a') as f:
         writer = csv.writer(f)
         for result in pool.imap_unordered(fctn, args):
             writer.writerows(result)
+
+
+class _SeededTask:
+    def __init__(self, fctn):
+        """
+        Picklable wrapper seeding the global np.random state before each call
+
+        :param fctn: Function to execute
+        """
+        self.fctn = fctn
+
+    def __call__(self, seeded_arg):
+        seed_sequence, arg = seeded_arg
+        np.random.seed(seed_sequence.generate_state(4))
+        return self.fctn(arg)
@@ -21,17 +21,15 @@ class NetworkStatisticGenerator(ABC):
 
 class BruteMGDGenerator(NetworkStatisticGenerator):
     @staticmethod
-    def generate(source):
+    def generate(source, num_threads=1):
         if type(source) == str:
-            G = empirical.networkx_from_gml(source)
+            n, edges = empirical.edges_from_gml(source)
         else:
-            G = source
-
-        n = len(G)
-        degrees = list(sorted([degree[1] for degree in G.degree]))
-        c = sum(degrees) / len(G)
+            n, edges = empirical.networkx_to_edges(source)
+        c = 2 * len(edges) / n
 
-        num_distances, sum_distances = ss.all_pairs_shortest_paths_rolling_sum(G)
+        num_distances, sum_distances = ss.all_pairs_shortest_paths_rolling_sum_from_edges(n, edges,
+                                                                                          num_threads=num_threads)
         if num_distances == 0:
             mgd = 0
         else:
@@ -75,18 +73,16 @@ class DistanceDistributionGenerator(NetworkStatisticGenerator):
     @staticmethod
     def generate(source):
         if type(source) == str:
-            G = empirical.networkx_from_gml(source)
+            n, edges = empirical.edges_from_gml(source)
         else:
-            G = source
+            n, edges = empirical.networkx_to_edges(source)
 
         print('Working on ' + source)
         sys.stdout.flush()
 
-        n = len(G)
-        degrees = list(sorted([degree[1] for degree in G.degree]))
-        c = sum(degrees) / len(G)
+        c = 2 * len(edges) / n
 
-        distribution = ss.all_pairs_shortest_paths(G)
+        distribution = ss.all_pairs_shortest_paths_from_edges(n, edges)
 
         ret = [source, n, c]
         dist_list = list(sorted([(k, v) for k, v in distribution.items()], key=lambda x: x[0]))
@@ -103,6 +99,33 @@ class DistanceDistributionGenerator(NetworkStatisticGenerator):
             return [ret]
 
 
+class SampledDistanceDistributionGenerator(NetworkStatisticGenerator):
+    @staticmethod
+    def generate(source, num_pivots=1000, num_threads=1):
+        if type(source) == str:
+            g = empirical.igraph_from_gml(source)
+        else:
+            g = source
+
+        n = g.vcount()
+        degrees = list(sorted([d for d in g.degree(mode='ALL', loops=False)]))
+        c = sum(degrees) / n
+
+        estimate, stderr = ps.pivot_sampler_igraph(g, num_pivots, num_threads=num_threads)
+
+        # Unlike DistanceDistributionGenerator's (distance, count) pairs, each distance is followed by
+        # two columns: (distance, estimated count, standard error of the count)
+        ret = [source if type(source) == str else '', n, c]
+        for k, (v, e) in enumerate(zip(estimate, stderr)):
+            ret.append(float(k))
+            ret.append(v)
+            ret.append(e)
+        # Print info for tracking after calculation has been completed
+        print(ret)
+        sys.stdout.flush()
+        return [ret]
+
+
 class GlobalClusteringGenerator(NetworkStatisticGenerator):
     @staticmethod
     def generate(source):
@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class BlockRNG:
+    def __init__(self, seed=None, block_size=65536):
+        """
+        np.random.Generator wrapper for hot loops drawing one number at a time.
+        Scalar draws are served from a block of uniforms drawn in one call, so they cost an array lookup
+        instead of a Generator call. Array draws, e.g. for numba kernels, go to the Generator directly.
+        Independent streams for workers come from spawn, so parallel runs are reproducible from one seed.
+
+        :param seed: Seed, np.random.SeedSequence, or None for fresh entropy
+        :param block_size: Number of uniforms drawn at a time
+        """
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        self.generator = np.random.default_rng(self.seed_sequence)
+        self.block_size = block_size
+        self._block = np.zeros(0)
+        self._pos = 0
+
+    def random(self, size=None):
+        """
+        Uniform floats in [0, 1)
+
+        :param size: Output shape. If None, a single float
+        :return: float, or ndarray of floats
+        """
+        if size is not None:
+            return self.generator.random(size)
+        if self._pos == len(self._block):
+            self._block = self.generator.random(self.block_size)
+            self._pos = 0
+        self._pos += 1
+        return float(self._block[self._pos - 1])
+
+    def uniforms(self, size):
+        """
+        The next size uniforms of the stream scalar draws come from, so a vectorized consumer can reproduce
+        a loop of scalar random and integers calls exactly
+
+        :param size: Number of uniforms
+        :return: ndarray of floats
+        """
+        values = np.empty(size)
+        take = min(size, len(self._block) - self._pos)
+        values[:take] = self._block[self._pos:self._pos + take]
+        self._pos += take
+        if take < size:
+            values[take:] = self.generator.random(size - take)
+        return values
+
+    def integers(self, high, size=None):
+        """
+        Uniform integers in [0, high). Scalar draws scale a block uniform, which has 53 random bits,
+        so the bias is below high / 2^53
+
+        :param high: Exclusive upper bound, scalar or ndarray
+        :param size: Output shape. If None, the shape of high
+        :return: int, or ndarray of int64
+        """
+        if size is not None or not np.isscalar(high):
+            return self.generator.integers(0, high, size=size)
+        return int(self.random() * high)
+
+    def choice(self, high, size, replace=True):
+        """
+        Draws from range(high), see np.random.Generator.choice
+
+        :param high: Number of items
+        :param size: Number of draws
+        :param replace: Draw with replacement
+        :return: ndarray of int64
+        """
+        return self.generator.choice(high, size, replace=replace)
+
+    def spawn(self, num_children):
+        """
+        Independent child streams, e.g. one per worker or per task
+
+        :param num_children: Number of children
+        :return: List of BlockRNG
+        """
+        return [BlockRNG(child, self.block_size) for child in self.seed_sequence.spawn(num_children)]
+
+
+class LegacyRNG:
+    """
+    Same interface as BlockRNG over the legacy global np.random state, so np.random.seed keeps reproducing runs
+    """
+    @staticmethod
+    def random(size=None):
+        return np.random.rand() if size is None else np.random.random_sample(size)
+
+    @staticmethod
+    def integers(high, size=None):
+        return np.random.randint(high, size=size)
+
+    @staticmethod
+    def choice(high, size, replace=True):
+        return np.random.choice(high, size, replace=replace)
+
+
+def as_rng(rng):
+    """
+    :param rng: BlockRNG, np.random.Generator, or None for the legacy global np.random state
+    :return: Object with random, integers and choice methods
+    """
+    if rng is None:
+        return LegacyRNG
+    if isinstance(rng, np.random.Generator):
+        return _GeneratorRNG(rng)
+    return rng
+
+
+class _GeneratorRNG:
+    def __init__(self, generator):
+        """
+        Same interface as BlockRNG over a plain np.random.Generator
+
+        :param generator: np.random.Generator
+        """
+        self.generator = generator
+
+    def random(self, size=None):
+        return self.generator.random(size)
+
+    def integers(self, high, size=None):
+        return self.generator.integers(0, high, size=size)
+
+    def choice(self, high, size, replace=True):
+        return self.generator.choice(high, size, replace=replace)
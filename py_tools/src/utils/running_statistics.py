@@ -0,0 +1,89 @@
+import numpy as np
+from statistics import NormalDist
+
+
+class RunningStatistics:
+    def __init__(self):
+        """
+        Streaming mean and variance, updated without keeping samples.
+        Single values use Welford's update, batches and other RunningStatistics are merged with Chan et al.'s
+        pairwise formula, so each update costs O(batch) regardless of how many samples came before.
+        """
+        self.n = 0
+        self.mean = 0.0
+        # Sum of squared deviations from the mean
+        self.m2 = 0.0
+
+    def add(self, value):
+        """
+        Adds a single sample
+
+        :param value: Number
+        """
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def add_batch(self, values):
+        """
+        Adds a batch of samples
+
+        :param values: Iterable of numbers
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        mean = np.mean(values)
+        self._merge(len(values), mean, float(np.sum((values - mean) ** 2)))
+
+    def merge(self, other):
+        """
+        Adds every sample summarized by another RunningStatistics
+
+        :param other: RunningStatistics
+        """
+        if other.n > 0:
+            self._merge(other.n, other.mean, other.m2)
+
+    def _merge(self, n, mean, m2):
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+
+    @property
+    def variance(self):
+        """
+        :return: Unbiased sample variance, nan with fewer than two samples
+        """
+        if self.n < 2:
+            return float('nan')
+        return self.m2 / (self.n - 1)
+
+    @property
+    def standard_error(self):
+        """
+        :return: Standard error of the mean, nan with fewer than two samples
+        """
+        return float(np.sqrt(self.variance / self.n)) if self.n >= 2 else float('nan')
+
+    def half_width(self, confidence=0.95):
+        """
+        Half-width of the normal confidence interval of the mean
+
+        :param confidence: Confidence level
+        :return: Half-width, nan with fewer than two samples
+        """
+        return NormalDist().inv_cdf(0.5 + confidence / 2) * self.standard_error
+
+    def confidence_interval(self, confidence=0.95):
+        """
+        Normal confidence interval of the mean
+
+        :param confidence: Confidence level
+        :return: Tuple, (low, high)
+        """
+        half_width = self.half_width(confidence)
+        return self.mean - half_width, self.mean + half_width
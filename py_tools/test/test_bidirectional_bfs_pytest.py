@@ -1,6 +1,7 @@
 import igraph
 import itertools
-from src.graph.bidirectional_bfs import bidirectional_bfs_distance_igraph
+import numpy as np
+from src.graph.bidirectional_bfs import bidirectional_bfs_distance_igraph, csr_from_igraph, distances
 
 
 #############################################
@@ -37,3 +38,26 @@ def test_distance_in_zkc():
     assert test_results == real_results
 
 
+#############################################
+# Test: distances
+#############################################
+def test_bulk_distances_zkc():
+    g = igraph.Graph.Famous(name='Zachary')
+    pairs = np.array(list(itertools.product(range(g.vcount()), repeat=2)))
+    expected = np.array(g.shortest_paths_dijkstra(weights=None))[pairs[:, 0], pairs[:, 1]]
+    assert distances(g, pairs).tolist() == expected.tolist()
+    assert distances(csr_from_igraph(g), pairs, num_threads=3).tolist() == expected.tolist()
+
+
+def test_bulk_distances_match_python_engine():
+    g = igraph.Graph.Barabasi(500, 2)
+    np.random.seed(0)
+    pairs = np.random.randint(0, g.vcount(), size=(300, 2))
+    assert distances(g, pairs).tolist() == [bidirectional_bfs_distance_igraph(g, i, j) for i, j in pairs.tolist()]
+
+
+def test_bulk_distances_unreachable():
+    g = igraph.Graph()
+    g.add_vertices(4)
+    g.add_edges([(0, 1), (2, 3)])
+    assert distances(g, [(0, 1), (0, 2), (3, 3), (3, 2)]).tolist() == [1, -1, 0, 1]
@@ -0,0 +1,51 @@
+from src.utils.block_rng import BlockRNG, LegacyRNG, as_rng
+import numpy as np
+
+
+#############################################
+# Test: BlockRNG
+#############################################
+def test_scalars_follow_generator_stream():
+    rng = BlockRNG(1, block_size=7)
+    values = [rng.random() for _ in range(20)]
+    # Blocks are consecutive draws from the same Generator
+    generator = np.random.default_rng(np.random.SeedSequence(1))
+    assert values == np.concatenate([generator.random(7) for _ in range(3)])[:20].tolist()
+
+
+def test_integers_in_range_and_uniform():
+    rng = BlockRNG(2)
+    draws = np.array([rng.integers(10) for _ in range(100000)])
+    assert draws.min() == 0 and draws.max() == 9
+    assert np.all(np.abs(np.bincount(draws) / len(draws) - 0.1) < 0.005)
+    block = rng.integers(np.array([3, 5, 7]), size=(1000, 3))
+    assert block.shape == (1000, 3) and np.all(block < [3, 5, 7]) and np.all(block >= 0)
+
+
+def test_reproducible_and_spawned_streams_differ():
+    a, b = BlockRNG(3), BlockRNG(3)
+    assert [a.integers(1000) for _ in range(50)] == [b.integers(1000) for _ in range(50)]
+    children = BlockRNG(3).spawn(2)
+    again = BlockRNG(3).spawn(2)
+    assert children[0].random(5).tolist() == again[0].random(5).tolist()
+    assert children[0].random(5).tolist() != children[1].random(5).tolist()
+
+
+def test_legacy_matches_global_state():
+    np.random.seed(4)
+    expected = [np.random.randint(17), np.random.rand(), np.random.randint(17, size=3).tolist()]
+    np.random.seed(4)
+    rng = as_rng(None)
+    assert rng is LegacyRNG
+    assert [rng.integers(17), rng.random(), rng.integers(17, size=3).tolist()] == expected
+
+
+def test_generator_adapter():
+    rng = as_rng(np.random.default_rng(5))
+    assert rng.integers(4, size=10).tolist() == np.random.default_rng(5).integers(0, 4, size=10).tolist()
+
+
+def test_uniforms_continue_scalar_stream():
+    rng, reference = BlockRNG(6, block_size=5), BlockRNG(6, block_size=5)
+    values = [rng.random() for _ in range(3)] + rng.uniforms(9).tolist() + [rng.random()]
+    assert values == [reference.random() for _ in range(13)]
@@ -0,0 +1,73 @@
+import networkx as nx
+from src.graph import semisparse as ss
+from src.graph.blockcut import all_pairs_shortest_paths_blockcut, all_pairs_shortest_paths_blockcut_rolling_sum
+
+
+#############################################
+# Test: block-cut APSP. Relies on already-tested semisparse module
+#############################################
+def test_empty():
+    G = nx.Graph()
+    assert all_pairs_shortest_paths_blockcut(G) == {0.0: 1} and \
+           all_pairs_shortest_paths_blockcut_rolling_sum(G) == (1, 0)  # convention
+
+
+def test_single_edge():
+    G = nx.Graph()
+    G.add_edge(1, 2)
+    assert all_pairs_shortest_paths_blockcut(G) == {0.0: 2, 1.0: 2} and \
+           all_pairs_shortest_paths_blockcut_rolling_sum(G) == (4, 2)
+
+
+def test_three_components():
+    G = nx.Graph()
+    # First triad
+    G.add_edges_from([(1, 2), (2, 3), (3, 1)])
+    # Second triad
+    G.add_edges_from([(4, 5), (5, 6), (6, 4)])
+    G.add_edge(9, 10)
+    G.add_node(11)
+    assert all_pairs_shortest_paths_blockcut(G) == ss.all_pairs_shortest_paths(G) and \
+           all_pairs_shortest_paths_blockcut_rolling_sum(G) == ss.all_pairs_shortest_paths_rolling_sum(G)
+
+
+def test_zkc():
+    G = nx.karate_club_graph()
+    assert all_pairs_shortest_paths_blockcut(G) == ss.all_pairs_shortest_paths(G) and \
+           all_pairs_shortest_paths_blockcut_rolling_sum(G) == ss.all_pairs_shortest_paths_rolling_sum(G)
+
+
+def test_tree():
+    G = nx.balanced_tree(3, 4)
+    assert all_pairs_shortest_paths_blockcut(G) == ss.all_pairs_shortest_paths(G) and \
+           all_pairs_shortest_paths_blockcut_rolling_sum(G) == ss.all_pairs_shortest_paths_rolling_sum(G)
+
+
+def test_biconnected():
+    # Single block, no articulation points
+    G = nx.cycle_graph(9)
+    assert all_pairs_shortest_paths_blockcut(G) == ss.all_pairs_shortest_paths(G) and \
+           all_pairs_shortest_paths_blockcut_rolling_sum(G) == ss.all_pairs_shortest_paths_rolling_sum(G)
+
+
+def test_cactus():
+    # Cycles and pendant paths hanging off each other's articulation points
+    G = nx.cycle_graph(6)
+    G.add_edges_from([(0, 10), (10, 11), (11, 0), (3, 20), (20, 21), (21, 22), (22, 3), (21, 30), (30, 31)])
+    G.add_edges_from([(11, 40), (40, 41), (41, 42), (42, 11), (41, 43)])
+    assert all_pairs_shortest_paths_blockcut(G) == ss.all_pairs_shortest_paths(G) and \
+           all_pairs_shortest_paths_blockcut_rolling_sum(G) == ss.all_pairs_shortest_paths_rolling_sum(G)
+
+
+def test_core_with_periphery():
+    G = nx.barabasi_albert_graph(200, 2, seed=1)
+    G.add_edges_from((200 + i, i % 50) for i in range(300))
+    G.add_edges_from((500 + i, 200 + i) for i in range(100))
+    assert all_pairs_shortest_paths_blockcut(G) == ss.all_pairs_shortest_paths(G) and \
+           all_pairs_shortest_paths_blockcut_rolling_sum(G) == ss.all_pairs_shortest_paths_rolling_sum(G)
+
+
+def test_sparse_random_graph():
+    G = nx.gnm_random_graph(400, 450, seed=7)
+    assert all_pairs_shortest_paths_blockcut(G) == ss.all_pairs_shortest_paths(G) and \
+           all_pairs_shortest_paths_blockcut_rolling_sum(G) == ss.all_pairs_shortest_paths_rolling_sum(G)
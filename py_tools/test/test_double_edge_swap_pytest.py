@@ -0,0 +1,96 @@
+import networkx as nx
+import numpy as np
+import pytest
+from src.graph.double_edge_swap import DoubleEdgeSwapEngine, _set_contains, _set_insert, _set_remove
+from src.graph.mcmc import MCMC_class, MCMCSamplerNX
+
+
+def _legacy_draws(m, num_swaps):
+    # Same calls, in the same order, as MCMC_step_stub and AbstractMCMCSampler._swap
+    first, second, flips = [], [], []
+    for _ in range(num_swaps):
+        first.append(np.random.randint(m))
+        second.append(np.random.randint(m - 1))
+        flips.append(np.random.rand())
+    return first, second, flips
+
+
+#############################################
+# Test: hash set
+#############################################
+def test_hash_set_matches_python_set():
+    table = np.full(64, -1, dtype=np.int64)
+    shift = 64 - 6
+    expected = set()
+    rng = np.random.default_rng(0)
+    for _ in range(5000):
+        key = int(rng.integers(0, 60))
+        if key in expected:
+            _set_remove(table, shift, key)
+            expected.remove(key)
+        elif len(expected) < 32:
+            _set_insert(table, shift, key)
+            expected.add(key)
+        assert all(_set_contains(table, shift, k) == (k in expected) for k in range(60))
+
+
+#############################################
+# Test: DoubleEdgeSwapEngine
+#############################################
+@pytest.mark.parametrize('G', [nx.karate_club_graph(), nx.gnm_random_graph(200, 800, seed=1),
+                               nx.star_graph(6)])
+def test_engine_matches_fosdick_reference(G):
+    # The reference keeps edge weights in its adjacency matrix, so it needs an unweighted graph
+    H = nx.Graph()
+    H.add_nodes_from(range(len(G)))
+    H.add_edges_from(G.edges)
+    G = H
+    num_swaps = 3000
+    np.random.seed(123)
+    reference = MCMC_class(G.copy(), False, False, False)
+    for _ in range(num_swaps):
+        reference.step_and_get_graph()
+
+    np.random.seed(123)
+    engine = DoubleEdgeSwapEngine(len(G), np.array(G.edges()))
+    accepted = engine.run_draws(*_legacy_draws(G.number_of_edges(), num_swaps))
+    assert engine.edges.tolist() == reference.edge_list.tolist()
+    assert engine.num_swaps == num_swaps and engine.num_accepted == accepted and 0 <= accepted <= num_swaps
+
+
+def test_engine_matches_networkx_backend():
+    G = nx.karate_club_graph()
+    np.random.seed(5)
+    sampler = MCMCSamplerNX(G.copy(), burn_swaps=0, mixing_swaps=2000)
+    sampler.get_new_sample()
+    np.random.seed(5)
+    engine = DoubleEdgeSwapEngine(len(G), list(G.edges))
+    engine.run_draws(*_legacy_draws(G.number_of_edges(), 2000))
+    assert engine.edges.tolist() == [list(e) for e in sampler._edges]
+
+
+def test_engine_keeps_graph_simple():
+    G = nx.barabasi_albert_graph(500, 3, seed=2)
+    engine = DoubleEdgeSwapEngine(len(G), list(G.edges))
+    accepted = engine.run(20000, np.random.default_rng(3))
+    assert accepted > 0 and engine.acceptance_rate == accepted / 20000
+    H = nx.Graph(engine.edges.tolist())
+    assert H.number_of_edges() == G.number_of_edges() and nx.number_of_selfloops(H) == 0
+    assert sorted(d for _, d in H.degree) == sorted(d for _, d in G.degree)
+
+
+def test_engine_needs_two_edges():
+    with pytest.raises(ValueError):
+        DoubleEdgeSwapEngine(2, [(0, 1)])
+
+
+def test_engine_matches_networkx_backend_with_block_rng():
+    from src.utils.block_rng import BlockRNG
+    G = nx.barabasi_albert_graph(100, 2, seed=4)
+    # Block boundaries fall mid-swap, the stream order must still match
+    networkx_sampler = MCMCSamplerNX(G.copy(), burn_swaps=500, mixing_swaps=700, rng=BlockRNG(6, block_size=100))
+    numba_sampler = MCMCSamplerNX(G.copy(), burn_swaps=500, mixing_swaps=700, rng=BlockRNG(6, block_size=100),
+                                  backend='numba')
+    for _ in range(2):
+        expected = networkx_sampler.get_new_sample()
+        assert sorted(map(sorted, numba_sampler.get_new_sample().edges)) == sorted(map(sorted, expected.edges))
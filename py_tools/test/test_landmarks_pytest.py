@@ -0,0 +1,70 @@
+import igraph
+import itertools
+import numpy as np
+import pytest
+from src.graph.bidirectional_bfs import distances
+from src.graph.landmarks import LandmarkOracle
+
+
+def _all_pairs(g):
+    return np.array(list(itertools.product(range(g.vcount()), repeat=2)))
+
+
+def _expected(g, pairs):
+    d = np.array(g.shortest_paths_dijkstra(weights=None), dtype=float)
+    d[np.isinf(d)] = -1
+    return d[pairs[:, 0], pairs[:, 1]].astype(np.int64)
+
+
+#############################################
+# Test: LandmarkOracle
+#############################################
+def test_oracle_zkc():
+    g = igraph.Graph.Famous(name='Zachary')
+    pairs = _all_pairs(g)
+    for selection in ['degree', 'random']:
+        oracle = LandmarkOracle(g, num_landmarks=4, selection=selection, seed=0)
+        assert oracle.distances(pairs).tolist() == _expected(g, pairs).tolist()
+        assert oracle.num_queries == len(pairs) and 0 < oracle.num_hits <= len(pairs)
+
+
+def test_oracle_bounds_bracket_distances():
+    g = igraph.Graph.Barabasi(300, 2)
+    pairs = _all_pairs(g)
+    expected = _expected(g, pairs)
+    lower, upper = LandmarkOracle(g, num_landmarks=3).bounds(pairs)
+    assert np.all(lower <= expected) and np.all(expected <= upper)
+
+
+def test_oracle_matches_bidirectional_bfs():
+    g = igraph.Graph.Barabasi(1000, 2)
+    np.random.seed(0)
+    pairs = np.random.randint(0, g.vcount(), size=(2000, 2))
+    oracle = LandmarkOracle(g, num_landmarks=8, num_threads=3)
+    assert oracle.distances(pairs).tolist() == distances(g, pairs).tolist()
+    assert 0 < oracle.hit_rate <= 1
+
+
+def test_oracle_disconnected():
+    # Two paths, an isolated node, and no landmark in the third component
+    g = igraph.Graph()
+    g.add_vertices(12)
+    g.add_edges([(0, 1), (1, 2), (2, 3), (4, 5), (5, 6), (6, 7), (7, 8), (9, 10)])
+    pairs = _all_pairs(g)
+    oracle = LandmarkOracle(g, num_landmarks=2)
+    assert oracle.distances(pairs).tolist() == _expected(g, pairs).tolist()
+    lower, upper = oracle.bounds([(0, 4), (0, 11)])
+    assert lower.tolist() == [-1, -1] and upper.tolist() == [-1, -1]
+
+
+def test_oracle_more_landmarks_than_nodes():
+    g = igraph.Graph.Ring(5)
+    oracle = LandmarkOracle(g, num_landmarks=16)
+    pairs = _all_pairs(g)
+    assert oracle.table.shape == (5, 5)
+    assert oracle.distances(pairs).tolist() == _expected(g, pairs).tolist() and oracle.hit_rate == 1
+
+
+def test_oracle_unknown_selection():
+    with pytest.raises(ValueError):
+        LandmarkOracle(igraph.Graph.Ring(5), selection='closeness')
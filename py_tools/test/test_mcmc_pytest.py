@@ -115,3 +115,72 @@ def test_equality_er_3():
            list(G.edges) == list(G2.edges) and \
            list(G.degree) == list(G2.degree) and \
            nx.degree_assortativity_coefficient(G) == nx.degree_assortativity_coefficient(G2)
+
+
+#############################################
+# Test: pluggable RNG
+#############################################
+def test_block_rng_reproducible():
+    from src.utils.block_rng import BlockRNG
+    G = nx.karate_club_graph()
+    samples = []
+    for _ in range(2):
+        sampler = MCMCSamplerNX(G.copy(), burn_swaps=0, mixing_swaps=500, rng=BlockRNG(11))
+        samples.append(sorted(map(sorted, sampler.get_new_sample().edges)))
+    assert samples[0] == samples[1] and samples[0] != sorted(map(sorted, G.edges))
+    assert [d for _, d in sorted(G.degree)] == [d for _, d in sorted(sampler.get_new_sample().degree)]
+
+
+#############################################
+# Test: numba backend
+#############################################
+def test_numba_backend_samples():
+    from src.utils.block_rng import BlockRNG
+    G = nx.relabel_nodes(nx.karate_club_graph(), lambda v: 'n' + str(v))
+    samples = []
+    for _ in range(2):
+        sampler = MCMCSamplerNX(G.copy(), burn_swaps=100, mixing_swaps=500, rng=BlockRNG(21), backend='numba')
+        samples.append(sampler.get_new_sample())
+    assert sorted(map(sorted, samples[0].edges)) == sorted(map(sorted, samples[1].edges))
+    assert sorted(map(sorted, samples[0].edges)) != sorted(map(sorted, G.edges))
+    assert dict(samples[0].degree) == dict(G.degree) and nx.number_of_selfloops(samples[0]) == 0
+    # The edge array is the only state, nothing networkx-side to drift from it
+    assert sampler._G is None and not hasattr(sampler, '_edges') and not hasattr(sampler, '_edges_dict')
+
+
+def test_numba_backend_igraph_and_convergence():
+    import igraph
+    g = igraph.Graph.Barabasi(300, 2)
+    np.random.seed(22)
+    sampler = MCMCSampler(g, convergence_threshold=0.05, backend='numba')
+    sample = sampler.get_new_sample()
+    assert sorted(sample.degree()) == sorted(g.degree()) and sample.is_simple()
+
+
+def test_numba_backend_rejects_local_swaps():
+    import pytest
+    with pytest.raises(ValueError):
+        MCMCSamplerNX(nx.karate_club_graph(), burn_swaps=0, p=0.5, backend='numba')
+
+
+#############################################
+# Test: incremental assortativity
+#############################################
+def test_tracked_assortativity_matches_igraph():
+    import igraph
+    for G in (nx.karate_club_graph(), nx.barabasi_albert_graph(300, 2, seed=23)):
+        for backend in ('networkx', 'numba'):
+            np.random.seed(24)
+            sampler = MCMCSamplerNX(G.copy(), burn_swaps=0, mixing_swaps=1000, backend=backend)
+            for _ in range(3):
+                sample = sampler.get_new_sample()
+                expected = networkx_to_igraph(sample).assortativity_degree(directed=False)
+                assert np.isclose(sampler._assortativity(), expected)
+                assert np.isclose(sampler._assortativity(), nx.degree_assortativity_coefficient(sample))
+
+
+def test_tracked_assortativity_local_swaps():
+    np.random.seed(25)
+    sampler = MCMCSamplerNX(nx.barabasi_albert_graph(200, 3, seed=26), burn_swaps=0, mixing_swaps=2000, p=0.5)
+    sample = sampler.get_new_sample()
+    assert np.isclose(sampler._assortativity(), nx.degree_assortativity_coefficient(sample))
@@ -1,6 +1,11 @@
 import igraph
 import numpy as np
-from src.graph.pathsample import _component_probability_generator_igraph
+from src.graph.pathsample import _component_probability_generator_igraph, _sample_node_pairs_igraph, \
+    sampler_no_rejection_igraph, threshold_sampler_igraph, source_sampler_igraph, parallel_threshold_sampler_igraph, \
+    confidence_sampler_igraph, pivot_sampler_igraph, stratified_sampler_igraph, _allocate, \
+    short_distance_sampler_igraph, _two_hop_counts_driver, _diameter_bound
+from src.graph.bidirectional_bfs import csr_from_igraph
+from src.graph import semisparse as ss
 
 
 #############################################
@@ -53,3 +58,255 @@ def test_np_random_choice():
         vals.append(np.random.choice(4, p=[0.1, 0.2, 0.4, 0.3]))
     # Test to make sure real sum is close to expectation
     assert sum(vals) - ((0.2*1*n) + (0.4*2*n) + (0.3*3*n)) in range(-500, 500)
+
+
+#############################################
+# Test: _sample_node_pairs_igraph
+#############################################
+def test_pairs_stay_in_component():
+    g = igraph.Graph()
+    g.add_vertices(7)
+    # comp sizes: 1, 3, 2, 1
+    g.add_edges([(1, 2), (1, 3), (4, 5)])
+    membership = g.components().membership
+    sources, targets = _sample_node_pairs_igraph(g, 5000)
+    assert len(sources) == len(targets) == 5000
+    assert all(membership[i] == membership[j] for i, j in zip(sources, targets))
+
+
+def test_pair_component_frequencies():
+    g = igraph.Graph()
+    g.add_vertices(6)
+    # comp sizes: 1, 3, 2, so pairs land in them with probabilities 1/14, 9/14, 4/14
+    g.add_edges([(1, 2), (1, 3), (4, 5)])
+    np.random.seed(0)
+    n = 14000
+    sources, _ = _sample_node_pairs_igraph(g, n)
+    counts = np.bincount(np.array(g.components().membership)[sources], minlength=3)
+    assert np.all(np.abs(counts - np.array([1000, 9000, 4000])) < 300)
+
+
+def test_pair_nodes_uniform_within_component():
+    g = igraph.Graph.Famous(name='Zachary')
+    np.random.seed(1)
+    sources, targets = _sample_node_pairs_igraph(g, 34000)
+    for nodes in (sources, targets):
+        assert np.all(np.abs(np.bincount(nodes, minlength=34) - 1000) < 150)
+
+
+#############################################
+# Test: distance engines
+#############################################
+def test_numba_engine_matches_python_engine():
+    g = igraph.Graph.Famous(name='Zachary')
+    np.random.seed(2)
+    python_samples = sampler_no_rejection_igraph(g, 500)
+    np.random.seed(2)
+    numba_samples = sampler_no_rejection_igraph(g, 500, engine='numba')
+    assert python_samples == numba_samples
+
+
+def test_threshold_sampler_numba_engine():
+    g = igraph.Graph.Famous(name='Zachary')
+    samples = threshold_sampler_igraph(g, threshold=0.1, batch_size=1000, engine='numba')
+    assert len(samples) % 1000 == 0 and abs(np.mean(samples) - 2.337) < 0.2
+
+
+#############################################
+# Test: source_sampler_igraph
+#############################################
+def test_source_sampler_vertex_transitive_is_exact():
+    # Every source of a ring has the same mean distance, (2 * (1 + 2 + 3 + 4) + 5) / 10
+    g = igraph.Graph.Ring(10)
+    estimate, stderr = source_sampler_igraph(g, 20)
+    assert estimate == 2.5 and stderr == 0
+
+
+def test_source_sampler_zkc():
+    g = igraph.Graph.Famous(name='Zachary')
+    exact = np.mean(g.shortest_paths_dijkstra(weights=None))
+    np.random.seed(3)
+    estimate, stderr = source_sampler_igraph(g, 400, num_threads=2)
+    assert abs(estimate - exact) < 4 * stderr
+    estimate, stderr = source_sampler_igraph(g, 400, num_targets=10)
+    assert abs(estimate - exact) < 4 * stderr
+
+
+def test_source_sampler_components():
+    # Rings of size 10 and 5 (mean distance 1.2), weighted by 100 and 25
+    g = igraph.Graph.Ring(10) + igraph.Graph.Ring(5)
+    np.random.seed(4)
+    estimate, stderr = source_sampler_igraph(g, 2000)
+    assert abs(estimate - (100 * 2.5 + 25 * 1.2) / 125) < 4 * stderr
+
+
+#############################################
+# Test: parallel_threshold_sampler_igraph
+#############################################
+def test_parallel_sampler_independent_of_worker_count():
+    g = igraph.Graph.Famous(name='Zachary')
+    samples = parallel_threshold_sampler_igraph(g, threshold=0.02, batch_size=200, num_workers=1, seed=5)
+    assert len(samples) % 200 == 0
+    for num_workers in (2, 4):
+        assert parallel_threshold_sampler_igraph(g, threshold=0.02, batch_size=200, num_workers=num_workers,
+                                                 seed=5) == samples
+
+
+def test_parallel_sampler_mean():
+    g = igraph.Graph.Famous(name='Zachary') + igraph.Graph.Ring(6)
+    exact = (34 ** 2 * np.mean(igraph.Graph.Famous(name='Zachary').shortest_paths_dijkstra(weights=None)) +
+             36 * 1.5) / (34 ** 2 + 36)
+    samples = parallel_threshold_sampler_igraph(g, threshold=0.001, batch_size=2000, num_workers=3, seed=6)
+    assert abs(np.mean(samples) - exact) < 4 * np.std(samples) / np.sqrt(len(samples))
+
+
+#############################################
+# Test: confidence_sampler_igraph
+#############################################
+def test_confidence_sampler_zkc():
+    g = igraph.Graph.Famous(name='Zachary')
+    exact = np.mean(g.shortest_paths_dijkstra(weights=None))
+    np.random.seed(7)
+    estimate, (low, high), n = confidence_sampler_igraph(g, tolerance=0.01, confidence=0.99)
+    assert low <= estimate <= high and high - low <= 2 * 0.01 * estimate
+    assert low - 0.01 <= exact <= high + 0.01
+    assert n % 1000 == 0
+
+
+def test_confidence_sampler_absolute_and_cap():
+    g = igraph.Graph.Famous(name='Zachary')
+    _, (low, high), n = confidence_sampler_igraph(g, tolerance=0.05, relative=False, batch_size=300)
+    assert high - low <= 0.1
+    _, _, n = confidence_sampler_igraph(g, tolerance=1e-6, batch_size=300, max_samples=1000)
+    assert n == 1000
+
+
+def test_confidence_sampler_single_node():
+    # Nothing to sample, same convention as the exact APSP
+    g = igraph.Graph()
+    g.add_vertices(1)
+    assert confidence_sampler_igraph(g) == (0.0, (0.0, 0.0), 0)
+
+
+#############################################
+# Test: pivot_sampler_igraph
+#############################################
+def test_pivot_sampler_vertex_transitive_is_exact():
+    # Every node of a ring sees 1 node at distance 0 and 5, and 2 at distances 1 to 4
+    g = igraph.Graph.Ring(10)
+    estimate, stderr = pivot_sampler_igraph(g, 3)
+    assert estimate.tolist() == [10, 20, 20, 20, 20, 10] and stderr.tolist() == [0] * 6
+
+
+def test_pivot_sampler_all_pivots_is_exact():
+    g = igraph.Graph.Famous(name='Zachary') + igraph.Graph.Ring(5) + igraph.Graph(1)
+    exact = ss.all_pairs_shortest_paths_from_edges(g.vcount(), g.get_edgelist())
+    estimate, stderr = pivot_sampler_igraph(g, 100, num_threads=3)
+    assert dict(enumerate(estimate.tolist())) == exact and not np.any(stderr)
+
+
+def test_pivot_sampler_zkc():
+    g = igraph.Graph.Famous(name='Zachary') + igraph.Graph.Ring(6)
+    exact = ss.all_pairs_shortest_paths_from_edges(g.vcount(), g.get_edgelist())
+    exact = np.array([exact[d] for d in range(len(exact))])
+    np.random.seed(8)
+    runs = []
+    for _ in range(300):
+        estimate, stderr = pivot_sampler_igraph(g, 8, num_threads=2)
+        assert len(estimate) == len(stderr) <= len(exact)
+        runs.append(np.pad(estimate, (0, len(exact) - len(estimate))))
+    # Unbiased, and the spread across runs matches the last run's standard errors
+    runs = np.array(runs)
+    assert np.all(np.abs(runs.mean(axis=0) - exact) <= 4 * runs.std(axis=0) / np.sqrt(len(runs)) + 1e-9)
+    assert np.all(stderr <= 3 * runs.std(axis=0)[:len(stderr)] + 1e-9)
+
+
+def test_diameter_bound():
+    # Path of 10 (diameter 9), star, isolated node
+    g = igraph.Graph([(i, i + 1) for i in range(9)]) + igraph.Graph.Star(6) + igraph.Graph(1)
+    indptr, indices = csr_from_igraph(g)
+    bound = _diameter_bound(indptr, indices, np.zeros(g.vcount(), dtype=indices.dtype),
+                            np.zeros(g.vcount(), dtype=np.int32))
+    assert 9 <= bound <= 9 * 2
+
+
+def test_pivot_sampler_single_node():
+    g = igraph.Graph()
+    g.add_vertices(1)
+    estimate, stderr = pivot_sampler_igraph(g, 5)
+    assert estimate.tolist() == [1] and stderr.tolist() == [0]
+
+
+#############################################
+# Test: stratified_sampler_igraph
+#############################################
+def _exact_mgd(g):
+    num_distances, sum_distances = ss.all_pairs_shortest_paths_rolling_sum_from_edges(g.vcount(), g.get_edgelist())
+    return sum_distances / num_distances
+
+
+def test_allocate():
+    assert _allocate(10, np.array([0.5, 0.25, 0.25])).tolist() == [5, 3, 2]
+    assert _allocate(7, np.array([0.1, 0.1, 0.8])).tolist() == [1, 1, 5]
+
+
+def test_stratified_sampler_small_components_are_exact():
+    g = igraph.Graph.Famous(name='Zachary') + igraph.Graph.Ring(5) + igraph.Graph(1)
+    estimate, stderr = stratified_sampler_igraph(g, 1000)
+    assert abs(estimate - _exact_mgd(g)) < 1e-12 and stderr == 0
+
+
+def test_stratified_sampler_fragmented():
+    # A giant component, a second large one, and many small fragments
+    g = igraph.Graph.Barabasi(600, 2) + igraph.Graph.Ring(300)
+    for size in range(2, 40):
+        g += igraph.Graph.Tree(size, 2)
+    np.random.seed(9)
+    estimate, stderr = stratified_sampler_igraph(g, 4000, cutoff=100, num_threads=2)
+    assert abs(estimate - _exact_mgd(g)) < 4 * stderr
+    # Same budget without stratification
+    samples = sampler_no_rejection_igraph(g, 4000, engine='numba')
+    assert stderr < np.std(samples) / np.sqrt(len(samples))
+
+
+#############################################
+# Test: short_distance_sampler_igraph
+#############################################
+def test_two_hop_counts():
+    g = igraph.Graph.Famous(name='Zachary') + igraph.Graph.Ring(7) + igraph.Graph(2)
+    g.add_edges([(0, 1), (40, 41)])  # Multi-edge, and an edge between the isolated nodes
+    exact = ss.all_pairs_shortest_paths_from_edges(g.vcount(), g.get_edgelist())
+    indptr, indices = csr_from_igraph(g)
+    stamps = np.zeros((3, g.vcount()), dtype=np.int32)
+    assert _two_hop_counts_driver(indptr, indices, stamps) == (exact[1.0], exact[2.0])
+
+
+def test_short_distance_sampler_diameter_two_is_exact():
+    g = igraph.Graph.Star(20) + igraph.Graph.Full(6)
+    estimate, stderr = short_distance_sampler_igraph(g, 100)
+    assert abs(estimate - _exact_mgd(g)) < 1e-12 and stderr == 0
+
+
+def test_short_distance_sampler_dense():
+    g = igraph.Graph.Erdos_Renyi(300, m=3000) + igraph.Graph.Ring(40)
+    np.random.seed(10)
+    estimate, stderr = short_distance_sampler_igraph(g, 2000, num_threads=2)
+    assert abs(estimate - _exact_mgd(g)) < 4 * stderr
+    # Same number of samples without the exact short distances
+    samples = sampler_no_rejection_igraph(g, 2000, engine='numba')
+    assert stderr < np.std(samples) / np.sqrt(len(samples))
+
+
+#############################################
+# Test: pluggable RNG
+#############################################
+def test_samplers_reproducible_with_block_rng():
+    from src.utils.block_rng import BlockRNG
+    g = igraph.Graph.Famous(name='Zachary') + igraph.Graph.Ring(5)
+    assert sampler_no_rejection_igraph(g, 500, rng=BlockRNG(12)) == \
+        sampler_no_rejection_igraph(g, 500, engine='numba', rng=BlockRNG(12))
+    for sampler in (lambda rng: source_sampler_igraph(g, 50, num_targets=5, rng=rng),
+                    lambda rng: pivot_sampler_igraph(g, 10, rng=rng)[0].tolist(),
+                    lambda rng: stratified_sampler_igraph(g, 300, cutoff=10, rng=rng),
+                    lambda rng: short_distance_sampler_igraph(g, 300, rng=rng)):
+        assert sampler(BlockRNG(14)) == sampler(BlockRNG(14))
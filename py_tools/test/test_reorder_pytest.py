@@ -0,0 +1,55 @@
+import networkx as nx
+import numpy as np
+import pytest
+from src.graph import semisparse as ss
+from src.graph.empirical import networkx_to_edges
+from src.graph.reorder import node_order, reorder_edges
+
+
+#############################################
+# Test: node_order()
+#############################################
+@pytest.mark.parametrize('method', ['bfs', 'rcm', 'degree'])
+def test_order_is_permutation(method):
+    G = nx.disjoint_union(nx.barabasi_albert_graph(200, 2, seed=1), nx.path_graph(10))
+    G.add_node(len(G))
+    order = node_order(*networkx_to_edges(G), method)
+    assert sorted(order.tolist()) == list(range(len(G)))
+
+
+def test_bfs_order_starts_at_hub():
+    order = node_order(*networkx_to_edges(nx.star_graph(5)), 'bfs')
+    assert order.tolist() == [0, 1, 2, 3, 4, 5]
+
+
+def test_bfs_order_keeps_components_together():
+    G = nx.disjoint_union(nx.path_graph(4), nx.star_graph(3))
+    order = node_order(*networkx_to_edges(G), 'bfs')
+    assert order.tolist() == [4, 5, 6, 7, 1, 0, 2, 3]
+
+
+def test_degree_order():
+    G = nx.Graph([(0, 1), (1, 2), (2, 3), (2, 4)])
+    assert node_order(*networkx_to_edges(G), 'degree').tolist() == [2, 1, 0, 3, 4]
+
+
+def test_unknown_order():
+    with pytest.raises(ValueError):
+        node_order(3, np.array([[0, 1], [1, 2]]), 'random')
+
+
+#############################################
+# Test: reordered APSP. Must match unordered APSP exactly
+#############################################
+@pytest.mark.parametrize('method', ['bfs', 'rcm', 'degree'])
+def test_reordered_distribution(method):
+    G = nx.disjoint_union_all([nx.karate_club_graph(), nx.gnm_random_graph(300, 400, seed=2), nx.empty_graph(3)])
+    assert ss.all_pairs_shortest_paths(G, reorder=method) == ss.all_pairs_shortest_paths(G)
+    assert ss.all_pairs_shortest_paths_rolling_sum(G, reorder=method) == ss.all_pairs_shortest_paths_rolling_sum(G)
+
+
+def test_reorder_edges_preserves_degrees():
+    num_nodes, edges = networkx_to_edges(nx.barabasi_albert_graph(100, 3, seed=4))
+    reordered = reorder_edges(num_nodes, edges, 'rcm')
+    assert sorted(np.bincount(edges.ravel(), minlength=num_nodes).tolist()) == \
+        sorted(np.bincount(reordered.ravel(), minlength=num_nodes).tolist())
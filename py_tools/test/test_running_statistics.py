@@ -0,0 +1,54 @@
+from src.utils.running_statistics import RunningStatistics
+import numpy as np
+
+
+#############################################
+# Test: RunningStatistics
+#############################################
+def test_empty():
+    statistics = RunningStatistics()
+    assert statistics.n == 0 and np.isnan(statistics.variance) and np.isnan(statistics.standard_error)
+
+
+def test_single_values_match_numpy():
+    values = np.random.RandomState(0).exponential(3.0, size=1000)
+    statistics = RunningStatistics()
+    for v in values:
+        statistics.add(v)
+    assert statistics.n == 1000
+    assert np.isclose(statistics.mean, np.mean(values))
+    assert np.isclose(statistics.variance, np.var(values, ddof=1))
+
+
+def test_batches_match_numpy():
+    values = np.random.RandomState(1).poisson(5.0, size=1003)
+    statistics = RunningStatistics()
+    for batch in np.array_split(values, 7):
+        statistics.add_batch(batch)
+    statistics.add_batch([])
+    assert statistics.n == 1003
+    assert np.isclose(statistics.mean, np.mean(values))
+    assert np.isclose(statistics.variance, np.var(values, ddof=1))
+    assert np.isclose(statistics.standard_error, np.std(values, ddof=1) / np.sqrt(1003))
+
+
+def test_merge():
+    values = np.random.RandomState(2).normal(1e6, 1.0, size=500)
+    first = RunningStatistics()
+    first.add_batch(values[:100])
+    second = RunningStatistics()
+    second.add_batch(values[100:])
+    first.merge(second)
+    first.merge(RunningStatistics())
+    assert first.n == 500
+    assert np.isclose(first.mean, np.mean(values))
+    assert np.isclose(first.variance, np.var(values, ddof=1))
+
+
+def test_confidence_interval():
+    statistics = RunningStatistics()
+    statistics.add_batch([1, 2, 3, 4, 5])
+    low, high = statistics.confidence_interval(0.95)
+    half_width = 1.959963984540054 * np.sqrt(2.5 / 5)
+    assert np.isclose(low, 3 - half_width) and np.isclose(high, 3 + half_width)
+    assert statistics.half_width(0.99) > statistics.half_width(0.95)
@@ -1,6 +1,10 @@
 import networkx as nx
+import numba as nb
+import numpy as np
+import pytest
 
 from src.graph import semisparse as ss
+from src.graph.empirical import networkx_to_edges, networkx_to_igraph, igraph_to_edges
 
 
 #############################################
@@ -244,3 +248,396 @@ def test_zkc_sum_distances():
     G = nx.karate_club_graph()
     sum_distances = sum([k*v for k, v in ss.all_pairs_shortest_paths(G).items()])
     assert sum_distances == sum([sum(x.values()) for _, x in nx.all_pairs_shortest_path_length(G)])
+
+
+#############################################
+# Test: multi-threaded APSP. Results must not depend on the number of threads
+#############################################
+def test_zkc_sum_distances_threaded():
+    G = nx.karate_club_graph()
+    assert ss.all_pairs_shortest_paths_rolling_sum(G, num_threads=4) == ss.all_pairs_shortest_paths_rolling_sum(G)
+
+
+def test_three_components_sum_distances_threaded():
+    G = nx.Graph()
+    # First triad
+    G.add_edges_from([(1, 2), (2, 3), (3, 1)])
+    # Second triad
+    G.add_edges_from([(4, 5), (5, 6), (6, 4)])
+    G.add_edge(9, 10)
+    assert ss.all_pairs_shortest_paths_rolling_sum(G, num_threads=4) == (3**2 + 3**2 + 2**2, 14)
+
+
+def test_more_threads_than_nodes_sum_distances():
+    G = nx.Graph()
+    G.add_edge(1, 2)
+    assert ss.all_pairs_shortest_paths_rolling_sum(G, num_threads=64) == (4, 2)
+
+
+def test_zkc_distribution_threaded():
+    G = nx.karate_club_graph()
+    assert ss.all_pairs_shortest_paths(G, num_threads=3) == ss.all_pairs_shortest_paths(G)
+
+
+def test_watts_strogatz_distribution_all_threads():
+    G = nx.connected_watts_strogatz_graph(200, 4, 0.3, seed=10)
+    assert ss.all_pairs_shortest_paths(G, num_threads=None) == ss.all_pairs_shortest_paths(G)
+
+
+def test_thread_count_restored():
+    # numba's thread count is process-wide, so a call must leave it as it found it
+    before = nb.get_num_threads()
+    G = nx.connected_watts_strogatz_graph(200, 4, 0.3, seed=10)
+    ss.all_pairs_shortest_paths(G, num_threads=1)
+    assert nb.get_num_threads() == before
+    with pytest.raises(ZeroDivisionError):
+        with ss._numba_threads(1):
+            1 / 0
+    assert nb.get_num_threads() == before
+
+
+#############################################
+# Test: adjacency layouts. CSR and padded semisparse must agree
+#############################################
+def test_zkc_sum_distances_semisparse_layout():
+    G = nx.karate_club_graph()
+    assert ss.all_pairs_shortest_paths_rolling_sum(G, layout='semisparse') == ss.all_pairs_shortest_paths_rolling_sum(G, layout='csr')
+
+
+def test_zkc_distribution_semisparse_layout():
+    G = nx.karate_club_graph()
+    assert ss.all_pairs_shortest_paths(G, layout='semisparse') == ss.all_pairs_shortest_paths(G, layout='csr')
+
+
+def test_star_distribution_csr_layout():
+    # Hub-dominated graph, the case the padded layout handles worst
+    G = nx.star_graph(50)
+    G.add_edges_from([(51, 52), (52, 53)])
+    assert ss.all_pairs_shortest_paths(G, layout='csr') == {0.0: 54, 1.0: 104, 2.0: 2452}
+
+
+def test_csr_uses_int32():
+    G = nx.karate_club_graph()
+    indptr, indices = ss.csr_from_edges(*networkx_to_edges(G))
+    assert indptr.dtype == np.int32 and indices.dtype == np.int32 and len(indices) == 2*G.number_of_edges()
+
+
+def test_unknown_layout():
+    G = nx.karate_club_graph()
+    with pytest.raises(ValueError):
+        ss.all_pairs_shortest_paths_rolling_sum(G, layout='dense')
+
+
+#############################################
+# Test: streamed distance histogram
+#############################################
+def _networkx_distribution(G):
+    distribution = {}
+    for _, lengths in nx.all_pairs_shortest_path_length(G):
+        for d in lengths.values():
+            distribution[d] = distribution.get(d, 0) + 1
+    return distribution
+
+
+def test_random_graph_distribution():
+    G = nx.gnm_random_graph(300, 330, seed=3)
+    assert ss.all_pairs_shortest_paths(G) == _networkx_distribution(G)
+
+
+def test_path_distribution():
+    # Eccentricity of node 0 is the diameter itself, the loosest case for the histogram bound
+    G = nx.path_graph(40)
+    assert ss.all_pairs_shortest_paths(G) == _networkx_distribution(G)
+
+
+def test_random_graph_sum_distances_is_exact_int():
+    G = nx.gnm_random_graph(300, 330, seed=3)
+    _, sum_distances = ss.all_pairs_shortest_paths_rolling_sum(G)
+    assert isinstance(sum_distances, int) and \
+           sum_distances == sum([k*v for k, v in _networkx_distribution(G).items()])
+
+
+#############################################
+# Test: direction-optimizing engine. Must match top-down BFS exactly
+#############################################
+def test_zkc_distribution_hybrid():
+    G = nx.karate_club_graph()
+    assert ss.all_pairs_shortest_paths(G, engine='hybrid') == _networkx_distribution(G)
+
+
+def test_three_components_sum_distances_hybrid():
+    G = nx.Graph()
+    # First triad
+    G.add_edges_from([(1, 2), (2, 3), (3, 1)])
+    # Second triad
+    G.add_edges_from([(4, 5), (5, 6), (6, 4)])
+    G.add_edge(9, 10)
+    G.add_node(11)
+    assert ss.all_pairs_shortest_paths_rolling_sum(G, engine='hybrid') == (3**2 + 3**2 + 2**2 + 1, 14)
+
+
+def test_random_graph_distribution_hybrid():
+    G = nx.gnm_random_graph(400, 2000, seed=5)
+    assert ss.all_pairs_shortest_paths(G, engine='hybrid') == ss.all_pairs_shortest_paths(G, engine='bfs')
+
+
+def test_star_distribution_hybrid():
+    G = nx.star_graph(50)
+    assert ss.all_pairs_shortest_paths(G, engine='hybrid', layout='semisparse') == _networkx_distribution(G)
+
+
+def test_path_distribution_hybrid_threaded():
+    G = nx.path_graph(40)
+    assert ss.all_pairs_shortest_paths(G, engine='hybrid', num_threads=3) == _networkx_distribution(G)
+
+
+def test_hybrid_switches_direction():
+    # Dense enough that the second level is expanded bottom-up
+    G = nx.gnm_random_graph(200, 4000, seed=1)
+    indptr, indices = ss.csr_from_edges(*networkx_to_edges(G))
+    tracker = np.full(len(G), -1, dtype=indices.dtype)
+    stamp = np.zeros(len(G), dtype=np.int32)
+    dist = np.zeros(len(G), dtype=np.uint8)
+    for epoch, source in enumerate(range(len(G)), start=1):
+        expected = np.bincount(ss._bfs_distances(indptr, indices, source, len(G), tracker).astype(np.int64))
+        histogram = np.zeros(len(G), dtype=np.int64)
+        ss._hybrid_bfs_histogram(indptr, indices, source, len(G), tracker, stamp, epoch, dist, histogram, 1)
+        assert histogram[:len(expected)].tolist() == expected.tolist()
+        assert not histogram[len(expected):].any()
+
+
+def test_unknown_engine():
+    G = nx.karate_club_graph()
+    with pytest.raises(ValueError):
+        ss.all_pairs_shortest_paths(G, engine='dijkstra')
+
+
+#############################################
+# Test: bit-parallel engine. Must match top-down BFS exactly
+#############################################
+def test_zkc_distribution_bitparallel():
+    G = nx.karate_club_graph()
+    assert ss.all_pairs_shortest_paths(G, engine='bitparallel') == _networkx_distribution(G)
+
+
+def test_three_components_sum_distances_bitparallel():
+    G = nx.Graph()
+    # First triad
+    G.add_edges_from([(1, 2), (2, 3), (3, 1)])
+    # Second triad
+    G.add_edges_from([(4, 5), (5, 6), (6, 4)])
+    G.add_edge(9, 10)
+    G.add_node(11)
+    assert ss.all_pairs_shortest_paths_rolling_sum(G, engine='bitparallel') == (3**2 + 3**2 + 2**2 + 1, 14)
+
+
+def test_random_graph_distribution_bitparallel():
+    # More than 64 sources per component, with a partial last batch
+    G = nx.gnm_random_graph(300, 330, seed=3)
+    assert ss.all_pairs_shortest_paths(G, engine='bitparallel') == _networkx_distribution(G)
+
+
+def test_path_distribution_bitparallel():
+    G = nx.path_graph(130)
+    assert ss.all_pairs_shortest_paths(G, engine='bitparallel', layout='semisparse') == _networkx_distribution(G)
+
+
+def test_watts_strogatz_distribution_bitparallel_threaded():
+    G = nx.connected_watts_strogatz_graph(500, 6, 0.2, seed=2)
+    assert ss.all_pairs_shortest_paths(G, engine='bitparallel', num_threads=3) == \
+           ss.all_pairs_shortest_paths(G, engine='bfs')
+
+
+def test_popcount():
+    assert [ss._popcount(np.uint64(x)) for x in [0, 1, 3, 2**63, 2**64 - 1]] == [0, 1, 2, 1, 64]
+
+
+#############################################
+# Test: twin collapsing. Must match uncollapsed APSP exactly
+#############################################
+def test_star_twin_classes():
+    # Leaves are false twins of each other
+    G = nx.star_graph(20)
+    indptr, indices = ss.csr_from_edges(*networkx_to_edges(G))
+    representatives, weights = ss._twin_classes(indptr, indices, len(G))
+    assert len(representatives) == 2 and sorted(weights) == [1, 20]
+
+
+def test_complete_graph_twin_classes():
+    # Every node is a true twin of every other
+    G = nx.complete_graph(10)
+    indptr, indices = ss.csr_from_edges(*networkx_to_edges(G))
+    representatives, weights = ss._twin_classes(indptr, indices, len(G))
+    assert list(weights) == [10]
+
+
+def test_star_distribution_twins():
+    G = nx.star_graph(50)
+    G.add_edges_from([(51, 52), (52, 53)])
+    assert ss.all_pairs_shortest_paths(G, collapse_twins=True) == {0.0: 54, 1.0: 104, 2.0: 2452}
+
+
+def test_zkc_distribution_twins():
+    G = nx.karate_club_graph()
+    assert ss.all_pairs_shortest_paths(G, collapse_twins=True) == _networkx_distribution(G)
+
+
+def test_hub_and_spokes_distribution_twins_all_engines():
+    # Hubs with pendant leaves, pairs of true twins and a clique
+    G = nx.barabasi_albert_graph(150, 1, seed=4)
+    G.add_edges_from([(150 + i, hub) for hub in range(5) for i in range(hub * 10, hub * 10 + 10)])
+    G.add_edges_from(nx.complete_graph(range(300, 306)).edges)
+    G.add_edge(300, 0)
+    expected = _networkx_distribution(G)
+    for engine in ['bfs', 'hybrid', 'bitparallel']:
+        assert ss.all_pairs_shortest_paths(G, engine=engine, collapse_twins=True) == expected
+
+
+def test_random_graph_sum_distances_twins_semisparse():
+    G = nx.gnm_random_graph(300, 330, seed=3)
+    assert ss.all_pairs_shortest_paths_rolling_sum(G, layout='semisparse', collapse_twins=True, num_threads=2) == \
+           ss.all_pairs_shortest_paths_rolling_sum(G)
+
+
+#############################################
+# Test: edge array entry points. Must match networkx entry points exactly
+#############################################
+def test_edges_three_components_sum_distances():
+    G = nx.disjoint_union_all([nx.karate_club_graph(), nx.path_graph(7), nx.star_graph(5)])
+    G.add_node(len(G))
+    assert ss.all_pairs_shortest_paths_rolling_sum_from_edges(*networkx_to_edges(G)) == \
+        ss.all_pairs_shortest_paths_rolling_sum(G)
+
+
+def test_igraph_edges_random_graph_distribution():
+    G = nx.gnm_random_graph(300, 500, seed=7)
+    num_nodes, edges = igraph_to_edges(networkx_to_igraph(G))
+    assert ss.all_pairs_shortest_paths_from_edges(num_nodes, edges) == _networkx_distribution(G)
+
+
+def test_edges_relabeled_nodes():
+    G = nx.relabel_nodes(nx.karate_club_graph(), {v: 'n' + str(v) for v in range(34)})
+    assert ss.all_pairs_shortest_paths(G) == _networkx_distribution(G)
+
+
+def test_csr_from_edges_drops_self_loops():
+    indptr, indices = ss.csr_from_edges(3, np.array([[0, 1], [1, 1], [1, 2]]))
+    assert indptr.tolist() == [0, 1, 3, 4]
+    assert sorted(indices[indptr[1]:indptr[2]].tolist()) == [0, 2]
+
+
+def test_edges_no_edges():
+    assert ss.all_pairs_shortest_paths_rolling_sum_from_edges(4, np.empty((0, 2), dtype=np.int64)) == (4, 0)
+
+
+#############################################
+# Test: array-based component decomposition
+#############################################
+def test_component_ranges_largest_first():
+    G = nx.disjoint_union_all([nx.path_graph(3), nx.empty_graph(2), nx.karate_club_graph(), nx.path_graph(2)])
+    indptr, indices, bounds = ss._component_ranges(*networkx_to_edges(G))
+    assert bounds.tolist() == [0, 34, 37, 39, 40, 41]
+    # Neighbor ids stay inside their own component
+    for c in range(len(bounds) - 1):
+        rows = indices[indptr[bounds[c]]:indptr[bounds[c + 1]]]
+        assert np.all((rows >= 0) & (rows < bounds[c + 1] - bounds[c]))
+
+
+def test_component_labels():
+    labels = ss._component_labels(6, np.array([[4, 5], [1, 3], [5, 1]]))
+    assert labels.tolist() == [0, 1, 2, 1, 1, 1]
+
+
+def test_many_small_components_distribution():
+    G = nx.disjoint_union_all([nx.gnm_random_graph(20, 25, seed=s) for s in range(30)] +
+                              [nx.barabasi_albert_graph(400, 2, seed=1), nx.empty_graph(10)])
+    for engine in ('bfs', 'hybrid', 'bitparallel'):
+        assert ss.all_pairs_shortest_paths(G, num_threads=3, engine=engine) == _networkx_distribution(G)
+
+
+def test_many_small_components_sum_distances():
+    G = nx.disjoint_union_all([nx.path_graph(s % 7 + 1) for s in range(50)] + [nx.path_graph(300)])
+    num_distances, sum_distances = ss.all_pairs_shortest_paths_rolling_sum(G)
+    assert num_distances == sum(len(c) ** 2 for c in nx.connected_components(G))
+    assert sum_distances == sum(sum(d.values()) for _, d in nx.all_pairs_shortest_path_length(G))
+
+
+#############################################
+# Test: warmup
+#############################################
+def test_warmup():
+    ss.warmup()
+    assert ss.all_pairs_shortest_paths_rolling_sum(nx.path_graph(4)) == (16, 20)
+
+
+#############################################
+# Test: checkpointed APSP. Resuming must give the same result as an uninterrupted run
+#############################################
+def test_checkpoint_resume(tmp_path, monkeypatch):
+    G = nx.disjoint_union(nx.barabasi_albert_graph(600, 2, seed=3), nx.path_graph(300))
+    expected = ss.all_pairs_shortest_paths_rolling_sum(G)
+    path = str(tmp_path / 'apsp.npz')
+    monkeypatch.setattr(ss, 'CHECKPOINT_EVERY', 128)
+
+    # Stop partway through the second large component
+    calls = []
+    driver = ss._all_pairs_shortest_paths_driver
+
+    def interrupted_driver(*args):
+        calls.append(1)
+        if len(calls) == 7:
+            raise KeyboardInterrupt
+        return driver(*args)
+
+    monkeypatch.setattr(ss, '_all_pairs_shortest_paths_driver', interrupted_driver)
+    with pytest.raises(KeyboardInterrupt):
+        ss.all_pairs_shortest_paths_rolling_sum(G, checkpoint=path)
+    with np.load(path) as f:
+        assert len(f['finished_lengths']) == 1
+        assert int(f['done']) == 128
+
+    monkeypatch.setattr(ss, '_all_pairs_shortest_paths_driver', driver)
+    assert ss.all_pairs_shortest_paths_rolling_sum(G, checkpoint=path) == expected
+    # A finished checkpoint is reused as is
+    assert ss.all_pairs_shortest_paths_rolling_sum(G, checkpoint=path) == expected
+
+
+def test_checkpoint_other_graph_ignored(tmp_path):
+    path = str(tmp_path / 'apsp.npz')
+    ss.all_pairs_shortest_paths_rolling_sum(nx.path_graph(300), checkpoint=path)
+    G = nx.cycle_graph(300)
+    assert ss.all_pairs_shortest_paths(G, engine='bitparallel', checkpoint=path) == _networkx_distribution(G)
+
+
+#############################################
+# Test: allocation-free kernels. Must match the distance-returning kernels exactly
+#############################################
+def test_histogram_kernels_reuse_stamps():
+    G = nx.barabasi_albert_graph(300, 3, seed=5)
+    indptr, indices = ss.csr_from_edges(*networkx_to_edges(G))
+    tracker = np.full(len(G), -1, dtype=indices.dtype)
+    stamp = np.zeros(len(G), dtype=np.int32)
+    dist = np.zeros(len(G), dtype=np.uint8)
+    # Stamps and distances are left dirty between sources, only the epoch changes
+    for epoch, source in enumerate(range(0, 300, 7), start=1):
+        expected = np.bincount(ss._bfs_distances(indptr, indices, source, len(G), tracker).astype(np.int64))
+        histogram = np.zeros(len(G), dtype=np.int64)
+        ecc = ss._bfs_histogram(indptr, indices, source, len(G), tracker, stamp, 2 * epoch - 1, histogram, 2)
+        assert ecc == len(expected) - 1
+        assert histogram[:len(expected)].tolist() == (2 * expected).tolist()
+        histogram[:] = 0
+        ecc = ss._hybrid_bfs_histogram(indptr, indices, source, len(G), tracker, stamp, 2 * epoch, dist, histogram, 1)
+        assert ecc == len(expected) - 1
+        assert histogram[:len(expected)].tolist() == expected.tolist()
+
+
+def test_distance_dtype():
+    assert ss._distance_dtype(256) == np.uint8
+    assert ss._distance_dtype(257) == np.uint16
+    assert ss._distance_dtype(70000) == np.uint32
+
+
+def test_long_path_distribution_hybrid():
+    # Diameter above 255 needs uint16 distances
+    G = nx.path_graph(400)
+    assert ss.all_pairs_shortest_paths(G, engine='hybrid') == _networkx_distribution(G)